@@ -0,0 +1,42 @@
+"""Compares the list based vrep pack/unpack helpers with their NumPy versions.
+"""
+
+from vrep_env import vrep
+
+import timeit
+import numpy as np
+
+def bench(stmt, number):
+	"""Best time of a few repetitions, in microseconds per call.
+	"""
+	return 1e6*min(timeit.repeat(stmt, number=number, repeat=5))/number
+
+def main(args):
+	n = int(args[1]) if len(args) > 1 else 10000
+	number = 20
+	
+	floats = np.random.uniform(-1, 1, n).astype('float32')
+	ints   = np.random.randint(-2**31, 2**31-1, n).astype('int32')
+	packed_floats = vrep.simxPackFloatsArray(floats)
+	packed_ints   = vrep.simxPackIntsArray(ints)
+	float_list = floats.tolist()
+	int_list   = ints.tolist()
+	
+	cases = [
+		('simxPackFloats'  , lambda: vrep.simxPackFloats(float_list),        lambda: vrep.simxPackFloatsArray(floats)),
+		('simxUnpackFloats', lambda: vrep.simxUnpackFloats(packed_floats),   lambda: vrep.simxUnpackFloatsArray(packed_floats)),
+		('simxPackInts'    , lambda: vrep.simxPackInts(int_list),            lambda: vrep.simxPackIntsArray(ints)),
+		('simxUnpackInts'  , lambda: vrep.simxUnpackInts(packed_ints),       lambda: vrep.simxUnpackIntsArray(packed_ints)),
+	]
+	
+	print('{} elements'.format(n))
+	print('{:<18}{:>14}{:>14}{:>10}'.format('function', 'list (us)', 'array (us)', 'speedup'))
+	for name, list_version, array_version in cases:
+		t_list  = bench(list_version , number)
+		t_array = bench(array_version, number)
+		print('{:<18}{:>14.1f}{:>14.1f}{:>9.0f}x'.format(name, t_list, t_array, t_list/t_array))
+	return 0
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(main(sys.argv))
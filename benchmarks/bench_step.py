@@ -0,0 +1,238 @@
+"""Step throughput of the example envs and of a synthetic chain of N links, for
+each remote API strategy:
+	blocking : blocking getters, one message per setter
+	streaming: streamed getters (set_streaming), one message per setter
+	batched  : streamed getters, setters of a step in one message (batched_commands)
+	pipelined: VrepEnv.set_pipelined, streamed getters read after a ping barrier
+	server   : VrepEnv.server_step, one round trip per step (chain env only)
+
+Prints JSON: steps/s, step and reset latencies (ms), mean duration of the step
+phases (VrepEnv.phase_stats), remote API calls per step
+(VrepEnv.rpc_stats), bytes per step, and with the fake backend round trips per
+step. Bytes are exact with the fake backend, estimated by VrepEnv.traffic_stats
+otherwise.
+Without a server listening on --port (or without the remoteApi library), the envs
+run against vrep_env.fake_simx.
+
+Usage:
+	python bench_step.py [--envs hopper cartpole] [--strategies blocking batched] [--steps 500] [--output results.json]
+"""
+
+from vrep_env import vrep_env
+from vrep_env import vrep
+from vrep_env import fake_simx
+from vrep_env.instance_pool import port_is_open
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import importlib
+import numpy as np
+
+import gym
+
+# The example envs are not part of the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'envs'))
+
+strategies = ['blocking', 'streaming', 'batched', 'pipelined', 'server']
+
+class ChainVrepEnv(vrep_env.VrepEnv):
+	"""Synthetic env: a chain of links (link0..) actuated by velocity joints
+	(link0_joint..). Only meant for the fake backend, which creates the objects.
+	"""
+	def __init__(self, server_addr='127.0.0.1', server_port=19997, links=8):
+		vrep_env.VrepEnv.__init__(self, server_addr, server_port)
+		self.oh_shape = self.get_object_handles(['link{}'.format(i) for i in range(links)])
+		self.oh_joint = self.get_object_handles(['link{}_joint'.format(i) for i in range(links)])
+		dim_obs = len(self.oh_shape)*12 + len(self.oh_joint)*2
+		self.action_space      = gym.spaces.Box(-np.ones(links), np.ones(links))
+		self.observation_space = gym.spaces.Box(-np.inf*np.ones(dim_obs), np.inf*np.ones(dim_obs))
+		self.observation = np.zeros(dim_obs, dtype='float32')
+
+	def use_server_step(self):
+		# Same layout as _make_observation
+		observed = [(h, q) for h in self.oh_shape for q in ('pose', 'velocity')]
+		observed += [(h, 'joint_state') for h in self.oh_joint]
+		self.setup_server_step('link0', self.oh_joint, observed)
+
+	def _make_observation(self):
+		n = len(self.oh_shape)*12
+		self.get_group_state(self.oh_shape, ['pose','velocity'], out=self.observation[:n])
+		self.get_group_state(self.oh_joint, ['joint_state'], out=self.observation[n:])
+
+	def step(self, action):
+		self.start_phases()
+		if self.server_step_config is not None:
+			self.server_step(action, out=self.observation)
+			self.end_phase('server_step')
+			return self.observation, float(self.observation[6]), False, self.end_step_phases({})
+		self.set_joint_targets(self.oh_joint, action)
+		self.end_phase('actuate')
+		self.step_simulation()
+		self.end_phase('trigger')
+		self._make_observation()
+		self.end_phase('observe')
+		return self.observation, float(self.observation[6]), False, self.end_step_phases({})
+
+	def reset(self):
+		self.reset_simulation()
+		self._make_observation()
+		return self.observation
+
+env_entry_points = {
+	'hopper'             : 'hopper_vrep_env:HopperVrepEnv',
+	'cartpole'           : 'cartpole_vrep_env:CartPoleVrepEnv',
+	'cartpole_continuous': 'cartpole_continuous_vrep_env:CartPoleContinuousVrepEnv',
+	'chain'              : ChainVrepEnv,
+}
+
+def load_env_class(entry_point):
+	if not isinstance(entry_point, str):
+		return entry_point
+	module_name, class_name = entry_point.split(':')
+	return getattr(importlib.import_module(module_name), class_name)
+
+def make_env(name, args):
+	env_class = load_env_class(env_entry_points[name])
+	if env_class is ChainVrepEnv:
+		return env_class(args.addr, args.port, links=args.links)
+	return env_class(server_addr=args.addr, server_port=args.port)
+
+def set_strategy(env, strategy):
+	env.set_streaming(strategy != 'blocking')
+	env.batching = (strategy == 'batched')
+	if strategy == 'pipelined':
+		env.set_pipelined()
+	if strategy == 'server':
+		env.use_server_step()
+
+def percentiles_ms(durations):
+	durations = 1000.0*np.array(durations)
+	return {
+		'mean': float(np.mean(durations)),
+		'p50' : float(np.percentile(durations, 50)),
+		'p99' : float(np.percentile(durations, 99)),
+	}
+
+def fake_counters(fake):
+	if fake is None:
+		return None
+	return np.array([fake.round_trips, fake.bytes_out + fake.bytes_in], dtype='float64')
+
+def count_rpcs(env):
+	return sum(stats['count'] for opmodes in env.rpc_stats().values() for stats in opmodes.values())
+
+def bench(name, strategy, args, fake):
+	env = make_env(name, args)
+	env.frame_skip = args.frame_skip
+	set_strategy(env, strategy)
+	env.enable_rpc_stats()
+	env.enable_phase_timer(window=args.steps)
+	env.enable_traffic_stats(ping_interval=0)
+	env.action_space.seed(args.seed)
+	step_durations = []
+	reset_durations = []
+	rpcs = 0
+	counters = 0.0
+	try:
+		# Warm-up: first start, stream subscriptions
+		env.reset()
+		for i in range(args.steps):
+			action = env.action_space.sample()
+			before = fake_counters(fake)
+			env.reset_rpc_stats()
+			t_start = time.perf_counter()
+			_, _, done, _ = env.step(action)
+			step_durations.append(time.perf_counter() - t_start)
+			rpcs += count_rpcs(env)
+			if fake is not None:
+				counters = counters + fake_counters(fake) - before
+			if done or (i+1) % args.episode_steps == 0:
+				t_start = time.perf_counter()
+				env.reset()
+				reset_durations.append(time.perf_counter() - t_start)
+		traffic = env.traffic_stats()['per_step']
+	finally:
+		env.close()
+	result = {
+		'env': name,
+		'strategy': strategy,
+		'steps': len(step_durations),
+		'resets': len(reset_durations),
+		'steps_per_sec': len(step_durations)/sum(step_durations),
+		'step_latency_ms': percentiles_ms(step_durations),
+		'reset_latency_ms': percentiles_ms(reset_durations) if reset_durations else None,
+		'rpcs_per_step': rpcs/len(step_durations),
+		'round_trips_per_step': None,
+		'bytes_per_step': None,
+		'phases_ms': {name: stats['mean_ns']/1e6 for name, stats in env.phase_stats().items()},
+	}
+	if fake is not None:
+		round_trips, nbytes = counters/len(step_durations)
+		result.update(round_trips_per_step=round_trips, bytes_per_step=nbytes)
+	else:
+		# Estimate of VrepEnv.traffic_stats, resets included
+		result.update(bytes_per_step=traffic['bytes_out'] + traffic['bytes_in'])
+	return result
+
+def main(args):
+	parser = argparse.ArgumentParser(description='Step throughput of vrep_env envs.')
+	parser.add_argument('--envs', nargs='+', default=sorted(env_entry_points), choices=sorted(env_entry_points))
+	parser.add_argument('--strategies', nargs='+', default=strategies, choices=strategies)
+	parser.add_argument('--steps', type=int, default=500)
+	parser.add_argument('--episode-steps', type=int, default=100, help='steps between forced resets')
+	parser.add_argument('--frame-skip', type=int, default=1, help='simulation steps per env step')
+	parser.add_argument('--links', type=int, default=8, help='links of the chain env')
+	parser.add_argument('--addr', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=19997)
+	parser.add_argument('--backend', default='auto', choices=['auto', 'vrep', 'fake'])
+	parser.add_argument('--latency', type=float, default=0.0005, help='fake round trip latency (s)')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', help='JSON file (default: stdout)')
+	args = parser.parse_args(args[1:])
+
+	backend = args.backend
+	if backend == 'auto':
+		available = vrep.libsimx is not None and port_is_open(args.addr, args.port)
+		backend = 'vrep' if available else 'fake'
+	if backend == 'fake':
+		# Scenes are not loaded by the fake backend
+		os.environ.setdefault('VREP_SCENES_PATH', '')
+
+	results = []
+	for name in args.envs:
+		for strategy in args.strategies:
+			if strategy == 'server' and not hasattr(load_env_class(env_entry_points[name]), 'use_server_step'):
+				continue
+			fake = fake_simx.install(latency=args.latency) if backend == 'fake' else None
+			try:
+				# Envs print to stdout
+				with contextlib.redirect_stdout(sys.stderr):
+					results.append(bench(name, strategy, args, fake))
+			finally:
+				if fake is not None:
+					fake_simx.uninstall()
+			print('{:20} {:10} {:10.1f} steps/s'.format(name, strategy, results[-1]['steps_per_sec']), file=sys.stderr)
+
+	report = {
+		'backend': backend,
+		'latency': args.latency if backend == 'fake' else None,
+		'frame_skip': args.frame_skip,
+		'python': platform.python_version(),
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'results': results,
+	}
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=1)
+	else:
+		json.dump(report, sys.stdout, indent=1)
+		print()
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
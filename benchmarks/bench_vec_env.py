@@ -0,0 +1,92 @@
+"""Compares serial stepping of several envs with ThreadedVrepVecEnv.
+One V-REP server must be listening on each given port; without them (or without
+the remoteApi library), the envs run against vrep_env.fake_simx.
+
+Usage:
+	python bench_vec_env.py hopper_vrep_env:HopperVrepEnv 19997 19998 19999 20000 [--steps 200]
+"""
+
+from vrep_env import vrep
+from vrep_env import fake_simx
+from vrep_env.vec_env import ThreadedVrepVecEnv, make_env_fns
+from vrep_env.instance_pool import port_is_open
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+import importlib
+import numpy as np
+
+# The example envs are not part of the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'envs'))
+
+def load_env_class(entry_point):
+	module_name, class_name = entry_point.split(':')
+	return getattr(importlib.import_module(module_name), class_name)
+
+def bench_serial(envs, steps):
+	for env in envs:
+		env.reset()
+	t_start = time.time()
+	for _ in range(steps):
+		for env in envs:
+			_, _, done, _ = env.step(env.action_space.sample())
+			if done:
+				env.reset()
+	return len(envs)*steps/(time.time() - t_start)
+
+def bench_threaded(venv, steps):
+	venv.reset()
+	t_start = time.time()
+	for _ in range(steps):
+		venv.step([venv.action_space.sample() for _ in range(venv.num_envs)])
+	return venv.num_envs*steps/(time.time() - t_start)
+
+def bench(env_fns, steps):
+	envs = [env_fn() for env_fn in env_fns]
+	serial = bench_serial(envs, steps)
+	for env in envs:
+		env.close()
+	
+	venv = ThreadedVrepVecEnv(env_fns)
+	threaded = bench_threaded(venv, steps)
+	venv.close()
+	return serial, threaded
+
+def main(args):
+	parser = argparse.ArgumentParser(description='Serial and threaded stepping of several envs.')
+	parser.add_argument('entry_point', help='module:class of the env, e.g. hopper_vrep_env:HopperVrepEnv')
+	parser.add_argument('ports', type=int, nargs='+')
+	parser.add_argument('--steps', type=int, default=200)
+	parser.add_argument('--addr', default='127.0.0.1')
+	parser.add_argument('--backend', default='auto', choices=['auto', 'vrep', 'fake'])
+	parser.add_argument('--latency', type=float, default=0.0005, help='fake round trip latency (s)')
+	args = parser.parse_args(args[1:])
+	
+	backend = args.backend
+	if backend == 'auto':
+		available = vrep.libsimx is not None and all(port_is_open(args.addr, port) for port in args.ports)
+		backend = 'vrep' if available else 'fake'
+	if backend == 'fake':
+		# Scenes are not loaded by the fake backend
+		os.environ.setdefault('VREP_SCENES_PATH', '')
+	
+	env_fns = make_env_fns(load_env_class(args.entry_point), args.ports, server_addr=args.addr)
+	fake = fake_simx.install(latency=args.latency) if backend == 'fake' else None
+	try:
+		# Envs print to stdout
+		with contextlib.redirect_stdout(sys.stderr):
+			serial, threaded = bench(env_fns, args.steps)
+	finally:
+		if fake is not None:
+			fake_simx.uninstall()
+	
+	print('{} envs, {} steps each, {} backend'.format(len(env_fns), args.steps, backend))
+	print('serial  : {:10.1f} steps/s'.format(serial))
+	print('threaded: {:10.1f} steps/s ({:.1f}x)'.format(threaded, threaded/serial))
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
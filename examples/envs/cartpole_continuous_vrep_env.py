@@ -9,6 +9,7 @@ permalink: https://perma.cc/C9ZM-652R
 
 from vrep_env import vrep_env
 from vrep_env import vrep
+from vrep_env.specs import ObservationSpec, ActionSpec
 
 import os
 vrep_scenes_path = os.environ['VREP_SCENES_PATH']
@@ -29,12 +30,15 @@ class CartPoleContinuousVrepEnv(vrep_env.VrepEnv):
 		server_addr='127.0.0.1',
 		server_port=19997,
 		scene_path=vrep_scenes_path+'/gym_cartpole.ttt',
+		snapshot_script=None,
+		trace=None,
 	):
 		vrep_env.VrepEnv.__init__(
 			self,
 			server_addr,
 			server_port,
 			scene_path,
+			trace,
 		)
 		
 		# getting object handles
@@ -43,6 +47,11 @@ class CartPoleContinuousVrepEnv(vrep_env.VrepEnv):
 		self.pole     = self.get_object_handle('pole')
 		self.viewer   = self.get_object_handle('viewer')
 		
+		# Snapshot resets: the object (e.g. 'cart') whose child script requires
+		# vrep_env.lua, which the stock scene does not have (see README)
+		self.snapshot_script  = snapshot_script
+		self.snapshot_handles = [self.cart, self.pole, self.action]
+		
 		# adjusting parameters
 		self.tau = 0.02  # seconds between state updates
 		self.gravity = 9.8
@@ -64,7 +73,16 @@ class CartPoleContinuousVrepEnv(vrep_env.VrepEnv):
 		self.min_action = -1.0
 		self.max_action =  1.0
 		
-		self.action_space = spaces.Box(low=self.min_action, high=self.max_action, shape=(1,))
+		# x, x_dot, theta, theta_dot
+		self.set_observation_spec(ObservationSpec([
+			('cart', 'position'   , [0]),
+			('cart', 'lin_vel'    , [0]),
+			('pole', 'orientation', [1]),
+			('pole', 'ang_vel'    , [1]),
+		]))
+		
+		# (also sets action_space)
+		self.set_action_spec(ActionSpec([self.action], scale=2.0, low=self.min_action, high=self.max_action))
 		self.observation_space = spaces.Box(-high, high)
 		
 		self.seed()
@@ -77,27 +95,25 @@ class CartPoleContinuousVrepEnv(vrep_env.VrepEnv):
 		return [seed]
 	
 	def _make_observation(self):
-		# discard y and z values
-		[  x   ,_,_ ]         = self.obj_get_position(self.cart)
-		[x_dot ,_,_ ] , _     = self.obj_get_velocity(self.cart)
-		
-		[_, theta ,_]         = self.obj_get_orientation(self.pole)
-		_ , [_, theta_dot ,_] = self.obj_get_velocity(self.pole)
-		
-		self.state = (x,x_dot,theta,theta_dot)
+		# Two calls (poses, velocities)
+		self.state = tuple(self.make_observation())
 	
 	def _make_action(self, a):
-		self.obj_set_velocity(self.action,a*2.0)
+		self.make_action(a)
 	
 	def step(self, action):
 		assert self.action_space.contains(action), "%r (%s) invalid"%(action, type(action))
 		
 		# Actuate
+		self.start_phases()
 		self._make_action(action)
+		self.end_phase('actuate')
 		# Step
 		self.step_simulation()
+		self.end_phase('trigger')
 		# Observe
 		self._make_observation()
+		self.end_phase('observe')
 		
 		(x,x_dot,theta,theta_dot) = self.state
 		
@@ -116,15 +132,15 @@ class CartPoleContinuousVrepEnv(vrep_env.VrepEnv):
 			self.steps_beyond_done += 1
 			reward = 0.0
 		
-		return np.array(self.state), reward, done, {}
+		self.end_phase('reward')
+		
+		return np.array(self.state), reward, done, self.end_step_phases({})
 	
 	def reset(self):
-		if self.sim_running:
-			self.stop_simulation()
-		self.start_simulation()
+		self.reset_simulation()
 		self.steps_beyond_done = None
 		
-		v = self.np_random.uniform(low=-0.04, high=0.04, size=(1,))
+		v = self.np_random.uniform(low=-0.04, high=0.04, size=(1,))[0]
 		self.obj_set_velocity(self.action,v)
 		self.step_simulation()
 		
@@ -9,6 +9,7 @@ permalink: https://perma.cc/C9ZM-652R
 
 from vrep_env import vrep_env
 from vrep_env import vrep
+from vrep_env.specs import ObservationSpec, ActionSpec
 
 import os
 vrep_scenes_path = os.environ['VREP_SCENES_PATH']
@@ -29,12 +30,15 @@ class CartPoleVrepEnv(vrep_env.VrepEnv):
 		server_addr='127.0.0.1',
 		server_port=19997,
 		scene_path=vrep_scenes_path+'/gym_cartpole.ttt',
+		snapshot_script=None,
+		trace=None,
 	):
 		vrep_env.VrepEnv.__init__(
 			self,
 			server_addr,
 			server_port,
 			scene_path,
+			trace,
 		)
 		
 		# getting object handles
@@ -43,6 +47,11 @@ class CartPoleVrepEnv(vrep_env.VrepEnv):
 		self.pole     = self.get_object_handle('pole')
 		self.viewer   = self.get_object_handle('viewer')
 		
+		# Snapshot resets: the object (e.g. 'cart') whose child script requires
+		# vrep_env.lua, which the stock scene does not have (see README)
+		self.snapshot_script  = snapshot_script
+		self.snapshot_handles = [self.cart, self.pole, self.action]
+		
 		# adjusting parameters
 		self.tau = 0.02  # seconds between state updates
 		self.gravity = 9.8
@@ -60,7 +69,19 @@ class CartPoleVrepEnv(vrep_env.VrepEnv):
 			self.x_threshold * 2,             np.finfo(np.float32).max,
 			self.theta_threshold_radians * 2, np.finfo(np.float32).max])
 		
-		self.action_space = spaces.Discrete(2)
+		# x, x_dot, theta, theta_dot
+		self.set_observation_spec(ObservationSpec([
+			('cart', 'position'   , [0]),
+			('cart', 'lin_vel'    , [0]),
+			('pole', 'orientation', [1]),
+			('pole', 'ang_vel'    , [1]),
+		]))
+		
+		# Pushes left or right
+		# 2000 is an arbitrary high value
+		# more info at: forum.coppeliarobotics.com/viewtopic.php?t=497
+		# (also sets action_space, Discrete(2))
+		self.set_action_spec(ActionSpec([self.action], choices=[[-2000.0], [2000.0]]))
 		self.observation_space = spaces.Box(-high, high)
 		
 		self.seed()
@@ -73,30 +94,25 @@ class CartPoleVrepEnv(vrep_env.VrepEnv):
 		return [seed]
 	
 	def _make_observation(self):
-		# discard y and z values
-		[  x   ,_,_ ]         = self.obj_get_position(self.cart)
-		[x_dot ,_,_ ] , _     = self.obj_get_velocity(self.cart)
-		
-		[_, theta ,_]         = self.obj_get_orientation(self.pole)
-		_ , [_, theta_dot ,_] = self.obj_get_velocity(self.pole)
-		
-		self.state = (x,x_dot,theta,theta_dot)
+		# Two calls (poses, velocities)
+		self.state = tuple(self.make_observation())
 	
 	def _make_action(self, a):
-		v = 1 if a==1 else -1
-		# 2000 is an arbitrary high value
-		# more info at: forum.coppeliarobotics.com/viewtopic.php?t=497
-		self.obj_set_velocity(self.action,v*2000.0)
+		self.make_action(a)
 	
 	def step(self, action):
 		assert self.action_space.contains(action), "%r (%s) invalid"%(action, type(action))
 		
 		# Actuate
+		self.start_phases()
 		self._make_action(action)
+		self.end_phase('actuate')
 		# Step
 		self.step_simulation()
+		self.end_phase('trigger')
 		# Observe
 		self._make_observation()
+		self.end_phase('observe')
 		
 		(x,x_dot,theta,theta_dot) = self.state
 		
@@ -115,15 +131,15 @@ class CartPoleVrepEnv(vrep_env.VrepEnv):
 			self.steps_beyond_done += 1
 			reward = 0.0
 		
-		return np.array(self.state), reward, done, {}
+		self.end_phase('reward')
+		
+		return np.array(self.state), reward, done, self.end_step_phases({})
 	
 	def reset(self):
-		if self.sim_running:
-			self.stop_simulation()
-		self.start_simulation()
+		self.reset_simulation()
 		self.steps_beyond_done = None
 		
-		v = self.np_random.uniform(low=-0.04, high=0.04, size=(1,))
+		v = self.np_random.uniform(low=-0.04, high=0.04, size=(1,))[0]
 		self.obj_set_velocity(self.action,v)
 		self.step_simulation()
 		
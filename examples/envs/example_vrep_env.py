@@ -5,6 +5,7 @@
 
 from vrep_env import vrep_env
 from vrep_env import vrep # vrep.sim_handle_parent
+from vrep_env.specs import ObservationSpec, ActionSpec
 
 import os
 vrep_scenes_path = os.environ['VREP_SCENES_PATH']
@@ -24,10 +25,14 @@ class ExampleVrepEnv(vrep_env.VrepEnv):
 		server_addr='127.0.0.1',
 		server_port=19997,
 		# #modify: the filename of your v-rep scene
-		scene_path=vrep_scenes_path+'/example.ttt'
+		scene_path=vrep_scenes_path+'/example.ttt',
+		# #modify: the object whose child script requires vrep_env.lua, for snapshot resets
+		snapshot_script=None,
+		# a trace file (see VrepEnv.enable_trace), including the connection
+		trace=None,
 	):
 		
-		vrep_env.VrepEnv.__init__(self,server_addr,server_port,scene_path)
+		vrep_env.VrepEnv.__init__(self,server_addr,server_port,scene_path,trace)
 		# #modify: the name of the joints to be used in action space
 		joint_names = [
 			'example_joint_0',
@@ -52,26 +57,31 @@ class ExampleVrepEnv(vrep_env.VrepEnv):
 		self.camera = self.get_object_handle('camera')
 		
 		# Actuators
-		self.oh_joint = list(map(self.get_object_handle, joint_names))
+		self.oh_joint = self.get_object_handles(joint_names)
 		# Shapes
-		self.oh_shape = list(map(self.get_object_handle, shape_names))
+		self.oh_shape = self.get_object_handles(shape_names)
 		
+		# Snapshot resets (reset_simulation), if the scene allows them
+		self.snapshot_script  = snapshot_script
+		self.snapshot_handles = self.oh_shape + self.oh_joint
 		
-		# #modify: if size of action space is different than number of joints
-		# Example: One action per joint
-		num_act = len(self.oh_joint)
 		
-		# #modify: if size of observation space is different than number of joints
-		# Example: 3 dimensions of linear and angular (2) velocities + 6 additional dimension
-		num_obs = (len(self.oh_shape)*3*2) + 3*2
-		
-		# #modify: action_space and observation_space to suit your needs
+		# #modify: the actuated joints, their control ('velocity', 'position' or 'force')
+		# and the bounds of the actions, scale and clip
+		# Example: One action per joint, a target velocity
+		# The spec sends all targets in one message and sets action_space
 		self.joints_max_velocity = 3.0
-		act = np.array( [self.joints_max_velocity] * num_act )
-		obs = np.array(          [np.inf]          * num_obs )
-		
-		self.action_space      = spaces.Box(-act,act)
-		self.observation_space = spaces.Box(-obs,obs)
+		self.set_action_spec(ActionSpec(joint_names, 'velocity',
+			low=-self.joints_max_velocity, high=self.joints_max_velocity))
+		
+		# #modify: the observed (object, quantity[, indices]), see vrep_env.group_quantities
+		# example: position and linear velocity of the head, then the position
+		# (relative to parent), angular and linear velocities of all shapes
+		# The spec is compiled into one call per quantity, whatever the number of shapes,
+		# and sets observation_space (unbounded)
+		self.set_observation_spec(ObservationSpec(
+			[('example_head', 'position'), ('example_head', 'lin_vel')] +
+			[(name, q) for name in shape_names for q in ('local_position', 'ang_vel', 'lin_vel')]))
 		
 		# #modify: optional message
 		print('ExampleVrepEnv: initialized')
@@ -80,34 +90,15 @@ class ExampleVrepEnv(vrep_env.VrepEnv):
 		"""Query V-rep to make observation.
 		   The observation is stored in self.observation
 		"""
-		# start with empty list
-		lst_o = [];
-		
-		# #modify: optionally include positions or velocities
-		pos               = self.obj_get_position(self.oh_shape[0])
-		lin_vel , ang_vel = self.obj_get_velocity(self.oh_shape[0])
-		lst_o += pos
-		lst_o += lin_vel
-		
-		# #modify
-		# example: include position, linear and angular velocities of all shapes
-		for i_oh in self.oh_shape:
-			rel_pos = self.obj_get_position(i_oh, relative_to=vrep.sim_handle_parent)
-			lst_o += rel_pos ;
-			lin_vel , ang_vel = self.obj_get_velocity(i_oh)
-			lst_o += ang_vel ;
-			lst_o += lin_vel ;
-		
-		self.observation = np.array(lst_o).astype('float32');
+		# #modify: optionally add values not covered by the spec
+		self.make_observation()
 	
 	def _make_action(self, a):
 		"""Query V-rep to make action.
 		   no return value
 		"""
-		# #modify
-		# example: set a velocity for each joint
-		for i_oh, i_a in zip(self.oh_joint, a):
-			self.obj_set_velocity(i_oh, i_a)
+		# #modify: optionally send commands not covered by the spec
+		self.make_action(a)
 	
 	def step(self, action):
 		"""Gym environment 'step'
@@ -117,11 +108,15 @@ class ExampleVrepEnv(vrep_env.VrepEnv):
 		assert self.action_space.contains(action), "Action {} ({}) is invalid".format(action, type(action))
 		
 		# Actuate
+		self.start_phases()
 		self._make_action(action)
+		self.end_phase('actuate')
 		# Step
 		self.step_simulation()
+		self.end_phase('trigger')
 		# Observe
 		self._make_observation()
+		self.end_phase('observe')
 		
 		# Reward
 		# #modify the reward computation
@@ -141,16 +136,16 @@ class ExampleVrepEnv(vrep_env.VrepEnv):
 		done = (head_pos_z < tolerable_threshold)
 		#done = False
 		
-		return self.observation, reward, done, {}
+		self.end_phase('reward')
+		
+		return self.observation.copy(), reward, done, self.end_step_phases({})
 	
 	def reset(self):
 		"""Gym environment 'reset'
 		"""
-		if self.sim_running:
-			self.stop_simulation()
-		self.start_simulation()
+		self.reset_simulation()
 		self._make_observation()
-		return self.observation
+		return self.observation.copy()
 	
 	def render(self, mode='human', close=False):
 		"""Gym environment 'render'
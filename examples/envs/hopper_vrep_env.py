@@ -1,5 +1,6 @@
 
 from vrep_env import vrep_env
+from vrep_env.specs import ObservationSpec, ActionSpec
 
 import os
 vrep_scenes_path = os.environ['VREP_SCENES_PATH']
@@ -16,12 +17,15 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 		server_addr='127.0.0.1',
 		server_port=-19997,
 		scene_path=vrep_scenes_path+'/hopper.ttt',
+		snapshot_script=None,
+		trace=None,
 	):
 		vrep_env.VrepEnv.__init__(
 			self,
 			server_addr,
 			server_port,
 			scene_path,
+			trace,
 		)
 		
 		# Settings
@@ -37,26 +41,30 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 		# Meta
 		self.camera = self.get_object_handle('camera')
 		# Actuators
-		self.oh_joint = list(map(self.get_object_handle, joint_names))
+		self.oh_joint = self.get_object_handles(joint_names)
 		# Shapes
-		self.oh_shape = list(map(self.get_object_handle, shape_names))
+		self.oh_shape = self.get_object_handles(shape_names)
 		
-		# One action per joint
-		dim_act = len(self.oh_joint)
-		# Multiple dimensions per shape
-		dim_obs = (len(self.oh_shape)*3*2)+1
-		
-		high_act =        np.ones([dim_act])
-		high_obs = np.inf*np.ones([dim_obs])
-		
-		self.action_space      = gym.spaces.Box(-high_act, high_act)
-		self.observation_space = gym.spaces.Box(-high_obs, high_obs)
+		# Snapshot resets: the object (e.g. 'torso') whose child script requires
+		# vrep_env.lua, which the stock scene does not have (see README)
+		self.snapshot_script  = snapshot_script
+		self.snapshot_handles = self.oh_shape + self.oh_joint
 		
 		# Parameters
 		self.joints_max_velocity = 8.0
 		#self.power = 0.75
 		self.power = 3.75
 		
+		# One action per joint, in [-1,1], scaled to a target velocity
+		# (also sets action_space)
+		self.set_action_spec(ActionSpec(joint_names, 'velocity', scale=self.power))
+		
+		# Torso z position, then angular and linear velocities of the shapes
+		# (also sets observation_space)
+		self.set_observation_spec(ObservationSpec(
+			[('torso', 'position', [2])] +
+			[(name, q) for name in shape_names for q in ('ang_vel', 'lin_vel')]))
+		
 		self.seed()
 		
 		print('HopperVrepEnv: initialized')
@@ -64,26 +72,13 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 	def _make_observation(self):
 		"""Get observation from v-rep and stores in self.observation
 		"""
-		lst_o = []
-		
-		# Include z position in observation
-		torso_pos = self.obj_get_position(self.oh_shape[0])
-		lst_o += [torso_pos[2]]
-		
-		# Include shapes relative velocities in observation
-		for i_oh in self.oh_shape:
-			lin_vel , ang_vel = self.obj_get_velocity(i_oh)
-			lst_o += ang_vel
-			lst_o += lin_vel
-		
-		self.observation = np.array(lst_o).astype('float32')
+		# Two calls (position, velocities), whatever the number of shapes
+		self.make_observation()
 	
 	def _make_action(self, a):
 		"""Send action to v-rep
 		"""
-		for i_oh, i_a in zip(self.oh_joint, a):
-			#self.obj_set_velocity(i_oh, i_a)
-			self.obj_set_velocity(i_oh, self.power*float(np.clip(i_a,-1,+1)))
+		self.make_action(a)
 	
 	def step(self, action):
 		# Clip xor Assert
@@ -91,12 +86,16 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 		assert self.action_space.contains(action), "%r (%s) invalid"%(action, type(action))
 		
 		# Actuate
+		self.start_phases()
 		self._make_action(action)
+		self.end_phase('actuate')
 		#self._make_action(action*self.joints_max_velocity)
 		# Step
 		self.step_simulation()
+		self.end_phase('trigger')
 		# Observe
 		self._make_observation()
+		self.end_phase('observe')
 		
 		# Reward
 		torso_pos_z  = self.observation[0] # up/down
@@ -110,12 +109,12 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 		done = (torso_pos_z < stand_threshold)
 		#done = False
 		
-		return self.observation, reward, done, {}
+		self.end_phase('reward')
+		
+		return self.observation.copy(), reward, done, self.end_step_phases({})
 	
 	def reset(self):
-		if self.sim_running:
-			self.stop_simulation()
-		self.start_simulation()
+		self.reset_simulation()
 		
 		# First action is random: emulate random initialization
 		if self.random_start:
@@ -125,7 +124,7 @@ class HopperVrepEnv(vrep_env.VrepEnv):
 			self.step_simulation()
 		
 		self._make_observation()
-		return self.observation
+		return self.observation.copy()
 	
 	def render(self, mode='human', close=False):
 		pass
@@ -0,0 +1,43 @@
+"""Stand-in for vrep.sh, for testing VrepInstancePool without V-REP.
+Accepts the same arguments and listens on the port of -gREMOTEAPISERVERSERVICE_<port>_...
+Extra options (VrepInstancePool extra_args):
+	--startup-delay=S  waits S seconds before listening
+	--crash-after=S    exits with code 3 S seconds after listening
+	--exit-code=N      exits at once with code N, without listening
+"""
+
+import sys
+import time
+import socket
+import argparse
+
+def main(args):
+	# -h is the headless flag of vrep.sh
+	parser = argparse.ArgumentParser(add_help=False)
+	parser.add_argument('-h', action='store_true')
+	parser.add_argument('-g')
+	parser.add_argument('--startup-delay', type=float, default=0.0)
+	parser.add_argument('--crash-after', type=float, default=None)
+	parser.add_argument('--exit-code', type=int, default=None)
+	args, _ = parser.parse_known_args(args[1:])
+	if args.exit_code is not None:
+		return args.exit_code
+	port = int(args.g.split('_')[1])
+	time.sleep(args.startup_delay)
+	server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	server.bind(('127.0.0.1', port))
+	server.listen(16)
+	server.settimeout(0.05)
+	t_start = time.time()
+	connections = []
+	while args.crash_after is None or time.time() - t_start < args.crash_after:
+		try:
+			connection, _ = server.accept()
+			connections.append(connection)
+		except socket.timeout:
+			pass
+	return 3
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
@@ -0,0 +1,102 @@
+import pytest
+
+from vrep_env import vrep
+from vrep_env import fake_simx
+
+ok      = vrep.simx_return_ok
+novalue = vrep.simx_return_novalue_flag
+
+@pytest.fixture
+def fake():
+	fake = fake_simx.install()
+	yield fake
+	fake_simx.uninstall()
+
+def connect(fake, port=19997):
+	cID = vrep.simxStart('127.0.0.1', port, True, True, 5000, 5)
+	assert cID != -1
+	return cID, fake.worlds[port]
+
+def joint_handle(cID, name='joint'):
+	ret, handle = vrep.simxGetObjectHandle(cID, name, vrep.simx_opmode_blocking)
+	assert ret == ok
+	return handle
+
+def test_blocking_waits_one_round_trip(fake):
+	cID, world = connect(fake)
+	joint = joint_handle(cID)
+	world.object(joint).joint_position = 0.5
+	round_trips = fake.round_trips
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_blocking) == (ok, 0.5)
+	assert fake.round_trips == round_trips + 1
+	assert not fake.errors
+
+def test_streaming_buffer_discontinue(fake):
+	cID, world = connect(fake)
+	joint = joint_handle(cID)
+	world.object(joint).joint_position = 0.5
+	round_trips = fake.round_trips
+	# Subscribing does not wait for the server
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_streaming)[0] == novalue
+	assert fake.round_trips == round_trips
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer)[0] == novalue
+	# The first reply comes with the next round trip
+	vrep.simxGetPingTime(cID)
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer) == (ok, 0.5)
+	# Buffer reads return the last received value, not the current one
+	world.object(joint).joint_position = 1.0
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer) == (ok, 0.5)
+	vrep.simxGetPingTime(cID)
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer) == (ok, 1.0)
+	# Subscribing again sends nothing
+	messages_out = fake.messages_out
+	vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_streaming)
+	assert fake.messages_out == messages_out
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_discontinue)[0] == ok
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer)[0] == novalue
+	vrep.simxGetPingTime(cID)
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer)[0] == novalue
+	assert not fake.errors
+
+def test_trigger_acknowledged_before_step(fake):
+	cID, world = connect(fake)
+	joint = joint_handle(cID)
+	assert vrep.simxSynchronous(cID, True) == ok
+	assert vrep.simxStartSimulation(cID, vrep.simx_opmode_blocking) == ok
+	assert vrep.simxSetJointTargetVelocity(cID, joint, 2.0, vrep.simx_opmode_blocking) == ok
+	vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_streaming)
+	vrep.simxGetPingTime(cID)
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer) == (ok, 0.0)
+	round_trips = fake.round_trips
+	assert vrep.simxSynchronousTrigger(cID) == ok
+	assert fake.round_trips == round_trips + 1
+	assert world.steps == 1
+	# The reply of the trigger predates the step
+	assert vrep.simxGetLastCmdTime(cID) == 0
+	assert vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer) == (ok, 0.0)
+	# Values of the step are delivered late, by the next round trip
+	vrep.simxGetPingTime(cID)
+	ret, position = vrep.simxGetJointPosition(cID, joint, vrep.simx_opmode_buffer)
+	assert ret == ok and position == pytest.approx(2.0*world.dt)
+	assert vrep.simxGetLastCmdTime(cID) == int(round(1000*world.dt))
+	assert not fake.errors
+
+def test_paused_communication_sends_one_message(fake):
+	cID, world = connect(fake)
+	a, b = joint_handle(cID, 'a_joint'), joint_handle(cID, 'b_joint')
+	messages_out = fake.messages_out
+	vrep.simxPauseCommunication(cID, True)
+	vrep.simxSetJointTargetVelocity(cID, a, 1.0, vrep.simx_opmode_oneshot)
+	vrep.simxSetJointTargetVelocity(cID, b, 2.0, vrep.simx_opmode_oneshot)
+	assert fake.messages_out == messages_out
+	vrep.simxPauseCommunication(cID, False)
+	assert fake.messages_out == messages_out + 1
+	assert world.object(a).joint_target == 1.0 and world.object(b).joint_target == 2.0
+	assert not fake.errors
+
+def test_unknown_object_is_a_remote_error(fake):
+	fake.create_missing = False
+	cID, _ = connect(fake)
+	ret, _ = vrep.simxGetObjectHandle(cID, 'missing', vrep.simx_opmode_blocking)
+	assert ret == vrep.simx_return_remote_error_flag
+	assert not fake.errors
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import pytest
+
+from vrep_env.instance_pool import VrepInstancePool, port_is_open
+
+stand_in = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_vrep_server.py')
+
+def make_pool(size, *extra_args, **kwargs):
+	# The stand-in runs with the current interpreter
+	return VrepInstancePool(size, executable=sys.executable, startup_timeout=10.0,
+		extra_args=extra_args, **kwargs)
+
+@pytest.fixture(autouse=True)
+def stand_in_command(monkeypatch):
+	command = VrepInstancePool.command
+	monkeypatch.setattr(VrepInstancePool, 'command',
+		lambda self, port: [self.executable, stand_in] + command(self, port)[1:])
+
+def wait_dead(instance, timeout=10.0):
+	t_start = time.time()
+	while instance.alive():
+		assert time.time() - t_start < timeout
+		time.sleep(0.05)
+
+def test_acquire_release():
+	with make_pool(2) as pool:
+		a = pool.acquire()
+		b = pool.acquire()
+		assert a.port != b.port
+		assert port_is_open(a.addr, a.port) and port_is_open(b.addr, b.port)
+		with pytest.raises(RuntimeError):
+			pool.acquire()
+		pool.release(a)
+		pool.release(a)
+		assert pool.idle == [a]
+		assert pool.acquire() is a
+	assert not a.alive() and not b.alive()
+
+def test_acquire_relaunches_dead_instance():
+	with make_pool(1, '--crash-after=0.5') as pool:
+		instance = pool.idle[0]
+		wait_dead(instance)
+		new_instance = pool.acquire()
+		assert new_instance is not instance
+		assert new_instance.alive() and port_is_open(new_instance.addr, new_instance.port)
+		assert pool.instances == [new_instance]
+
+def test_recycle():
+	with make_pool(2, '--crash-after=0.5') as pool:
+		busy = pool.acquire()
+		idle = pool.idle[0]
+		wait_dead(busy)
+		wait_dead(idle)
+		relaunched = pool.recycle()
+		assert len(relaunched) == 2
+		assert all(instance.alive() for instance in relaunched)
+		assert len(pool.idle) == 1 and pool.idle[0] in relaunched
+		assert idle not in pool.instances and busy not in pool.instances
+		# The acquired instance died: its replacement is released as usual
+		busy_new, = [instance for instance in relaunched if instance not in pool.idle]
+		pool.release(busy_new)
+		assert len(pool.idle) == 2
+
+def test_failed_relaunch_keeps_slot():
+	with make_pool(1, '--crash-after=0.5') as pool:
+		instance = pool.idle[0]
+		wait_dead(instance)
+		launched = []
+		launch = pool.launch
+		def record_launch():
+			launched.append(launch())
+			return launched[-1]
+		pool.launch = record_launch
+		pool.extra_args = ['--exit-code=5']
+		with pytest.raises(RuntimeError, match='exited with code 5'):
+			pool.acquire()
+		assert pool.instances == [instance] and pool.idle == [instance]
+		assert not launched[0].alive()
+		pool.extra_args = []
+		new_instance = pool.acquire()
+		assert new_instance is launched[1] and new_instance.alive()
+		assert pool.instances == [new_instance] and pool.idle == []
+
+def test_terminate_without_process_groups(monkeypatch):
+	with make_pool(1) as pool:
+		instance = pool.acquire()
+		monkeypatch.delattr(os, 'killpg')
+		instance.terminate()
+		assert not instance.alive()
+
+def test_startup_failure_cleans_up():
+	with pytest.raises(RuntimeError, match='exited with code 5'):
+		make_pool(2, '--exit-code=5')
+
+def test_startup_timeout():
+	with pytest.raises(RuntimeError, match='did not open port'):
+		VrepInstancePool(1, executable=sys.executable, startup_timeout=0.3,
+			extra_args=['--startup-delay=5'])
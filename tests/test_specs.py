@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from vrep_env import fake_simx
+from vrep_env.vrep_env import VrepEnv
+from vrep_env.specs import ObservationSpec, ActionSpec
+
+@pytest.fixture
+def fake():
+	fake = fake_simx.install()
+	yield fake
+	fake_simx.uninstall()
+
+@pytest.fixture
+def env(fake):
+	env = VrepEnv('127.0.0.1', 19997)
+	yield env
+	env.close()
+
+def place(fake, env, name, position, orientation, lin_vel=(0, 0, 0), ang_vel=(0, 0, 0)):
+	o = fake.worlds[env.server_port].object(env.get_object_handle(name))
+	o.position    = np.array(position, dtype='float64')
+	o.orientation = np.array(orientation, dtype='float64')
+	o.lin_vel     = np.array(lin_vel, dtype='float64')
+	o.ang_vel     = np.array(ang_vel, dtype='float64')
+
+def test_combined_quantities(env):
+	spec = ObservationSpec([('torso', 'position'), ('torso', 'orientation'), ('thigh', 'lin_vel')])
+	assert set(spec.compile(env).fetches) == {'pose', 'lin_vel'}
+	spec = ObservationSpec([('torso', 'lin_vel'), ('thigh', 'ang_vel', [1])])
+	assert set(spec.compile(env).fetches) == {'velocity'}
+	spec = ObservationSpec([('torso', 'position'), ('thigh', 'pose', [5])])
+	assert set(spec.compile(env).fetches) == {'pose'}
+
+def test_observation_layout(fake, env):
+	place(fake, env, 'torso', (1, 2, 3), (0.1, 0.2, 0.3), lin_vel=(4, 5, 6))
+	place(fake, env, 'thigh', (7, 8, 9), (0.4, 0.5, 0.6), ang_vel=(-1, -2, -3))
+	spec = ObservationSpec([
+		('thigh', 'orientation', [2, 0]),
+		('torso', 'position', [2]),
+		('thigh', 'ang_vel'),
+		('torso', 'lin_vel', [1]),
+		('thigh', 'position'),
+	])
+	assert spec.size == 10
+	env.set_observation_spec(spec)
+	assert env.observation_space.shape == (10,)
+	fake.reset_counters()
+	observation = env.make_observation()
+	# One call per fetched quantity: pose and velocity
+	assert fake.calls['simxGetObjectGroupData'] == 2
+	expected = [0.6, 0.4, 3, -1, -2, -3, 5, 7, 8, 9]
+	assert observation == pytest.approx(np.array(expected, dtype='float32'))
+	assert not fake.errors
+
+def test_observation_follows_new_objects(fake, env):
+	place(fake, env, 'torso', (1, 2, 3), (0, 0, 0))
+	env.set_observation_spec(ObservationSpec([('torso', 'position', [0])]))
+	assert env.make_observation() == pytest.approx([1])
+	# Objects returned by the server in another order
+	place(fake, env, 'arm', (4, 5, 6), (0, 0, 0))
+	fake.worlds[env.server_port].objects.move_to_end(env.get_object_handle('torso'))
+	assert env.make_observation() == pytest.approx([1])
+	assert env.observation_plan.fetches['position'].all_handles[-1] == env.get_object_handle('torso')
+
+def test_indices_out_of_range():
+	with pytest.raises(ValueError):
+		ObservationSpec([('torso', 'position', [3])])
+
+def joint_targets(fake, env, names):
+	world = fake.worlds[env.server_port]
+	joints = [world.object(env.get_object_handle(name)) for name in names]
+	return [joint.joint_target for joint in joints], [joint.joint_control for joint in joints]
+
+def test_action_clip_scale(fake, env):
+	names = ['a_joint', 'b_joint', 'c_joint']
+	env.set_action_spec(ActionSpec(names, scale=[2.0, 3.0, 4.0], low=-1.0, high=[1.0, 0.5, 1.0]))
+	assert env.action_space.shape == (3,)
+	messages_out = fake.messages_out
+	env.make_action(np.array([0.5, 0.75, -2.0]))
+	# All targets in one message
+	assert fake.messages_out == messages_out + 1
+	targets, controls = joint_targets(fake, env, names)
+	assert targets == pytest.approx([1.0, 1.5, -4.0])
+	assert controls == ['velocity']*3
+	assert not fake.errors
+
+def test_action_position_degrees(fake, env):
+	env.set_action_spec(ActionSpec(['a_joint'], control='position', scale=90.0))
+	env.make_action([0.5])
+	targets, controls = joint_targets(fake, env, ['a_joint'])
+	assert targets == pytest.approx([-np.pi/4])
+	assert controls == ['position']
+
+def test_action_choices(fake, env):
+	env.set_action_spec(ActionSpec(['cart_joint'], choices=[[-2000.0], [2000.0]]))
+	assert env.action_space.n == 2
+	env.make_action(1)
+	assert joint_targets(fake, env, ['cart_joint'])[0] == [2000.0]
+	env.make_action(0)
+	assert joint_targets(fake, env, ['cart_joint'])[0] == [-2000.0]
+
+def test_action_choices_one_target_per_joint():
+	with pytest.raises(ValueError):
+		ActionSpec(['a_joint', 'b_joint'], choices=[[1.0], [2.0]])
+	with pytest.raises(ValueError):
+		ActionSpec(['a_joint', 'b_joint'], choices=[[1.0, 2.0], [3.0]])
+	with pytest.raises(ValueError):
+		ActionSpec(['a_joint'], choices=[1.0, 2.0])
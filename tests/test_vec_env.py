@@ -0,0 +1,114 @@
+import time
+import functools
+import multiprocessing
+from multiprocessing import shared_memory
+
+import gym
+import numpy as np
+import pytest
+
+from vrep_env.vec_env import VrepVecEnv, ThreadedVrepVecEnv
+
+class StubEnv(object):
+	"""Observation (steps in the episode, last action); episodes of episode_length
+	steps. Fails on the given step, or when created with fail_init.
+	"""
+	def __init__(self, episode_length=3, fail_step=None, fail_init=False, step_delay=0.0):
+		if fail_init:
+			raise ValueError('stub env failed to start')
+		self.episode_length = episode_length
+		self.fail_step = fail_step
+		self.step_delay = step_delay
+		self.observation_space = gym.spaces.Box(-np.inf, np.inf, shape=(2,), dtype=np.float32)
+		self.action_space = gym.spaces.Box(-1.0, 1.0, shape=(1,), dtype=np.float32)
+		self.steps = 0
+		self.total_steps = 0
+		self.steps_when_closed = None
+
+	def reset(self):
+		self.steps = 0
+		return np.zeros(2, dtype='float32')
+
+	def step(self, action):
+		time.sleep(self.step_delay)
+		self.steps += 1
+		self.total_steps += 1
+		if self.total_steps == self.fail_step:
+			raise ValueError('stub env failed to step')
+		obs = np.array([self.steps, action[0]], dtype='float32')
+		return obs, float(self.steps), self.steps == self.episode_length, {}
+
+	def close(self):
+		self.steps_when_closed = self.total_steps
+
+def stub_fns(*kwargs_list):
+	return [functools.partial(StubEnv, **kwargs) for kwargs in kwargs_list]
+
+@pytest.fixture(params=[VrepVecEnv, ThreadedVrepVecEnv])
+def vec_env_class(request):
+	return request.param
+
+def test_auto_reset(vec_env_class):
+	venv = vec_env_class(stub_fns({'episode_length': 2}, {'episode_length': 3}))
+	try:
+		assert venv.reset().tolist() == [[0, 0], [0, 0]]
+		obs, rewards, dones, infos = venv.step([[0.5], [-0.5]])
+		assert obs.tolist() == [[1, 0.5], [1, -0.5]]
+		assert rewards.tolist() == [1, 1]
+		assert dones.tolist() == [False, False]
+		obs, rewards, dones, infos = venv.step([[0.25], [0.25]])
+		# The first env is done: reset, its final observation kept in the info
+		assert obs.tolist() == [[0, 0], [2, 0.25]]
+		assert dones.tolist() == [True, False]
+		assert infos[0]['terminal_observation'].tolist() == [2, 0.25]
+		assert 'terminal_observation' not in infos[1]
+		obs, _, dones, infos = venv.step([[0], [0]])
+		assert obs.tolist() == [[1, 0], [0, 0]]
+		assert dones.tolist() == [False, True]
+		assert infos[1]['terminal_observation'].tolist() == [3, 0]
+	finally:
+		venv.close()
+	venv.close()
+
+def test_failing_worker():
+	venv = VrepVecEnv(stub_fns({}, {'fail_step': 2}, {}))
+	venv.reset()
+	venv.step([[0], [0], [0]])
+	with pytest.raises(RuntimeError, match='failed to step'):
+		venv.step([[0], [0], [0]])
+	assert not venv.waiting
+	shm_name = venv.shm.name
+	venv.close()
+	assert not any(process.is_alive() for process in venv.processes)
+	with pytest.raises(FileNotFoundError):
+		shared_memory.SharedMemory(name=shm_name)
+
+def test_close_while_waiting():
+	venv = VrepVecEnv(stub_fns({}, {}))
+	venv.reset()
+	venv.step_async([[0], [0]])
+	venv.close()
+	assert not any(process.is_alive() for process in venv.processes)
+
+def test_failing_init():
+	with pytest.raises(RuntimeError, match='failed to start'):
+		VrepVecEnv(stub_fns({}, {'fail_init': True}, {}))
+	assert not [p for p in multiprocessing.active_children() if p.name.startswith('Process')]
+
+def test_threaded_close_waits_for_steps():
+	venv = ThreadedVrepVecEnv(stub_fns({'step_delay': 0.2}, {'fail_step': 1}))
+	venv.reset()
+	venv.step_async([[0], [0]])
+	venv.close()
+	assert [env.steps_when_closed for env in venv.envs] == [1, 1]
+	venv.close()
+
+def test_threaded_failing_env():
+	venv = ThreadedVrepVecEnv(stub_fns({'step_delay': 0.2}, {'fail_step': 1}))
+	venv.reset()
+	with pytest.raises(ValueError, match='failed to step'):
+		venv.step([[0], [0]])
+	# The other env was done stepping
+	assert venv.envs[0].total_steps == 1
+	assert venv.futures is None
+	venv.close()
@@ -0,0 +1,117 @@
+import json
+import numpy as np
+import pytest
+
+from vrep_env import fake_simx
+from vrep_env.vrep_env import VrepEnv
+
+@pytest.fixture
+def fake():
+	fake = fake_simx.install()
+	yield fake
+	fake_simx.uninstall()
+
+@pytest.fixture
+def env(fake):
+	env = VrepEnv('127.0.0.1', 19997)
+	env.set_streaming(True)
+	yield env
+	env.close()
+
+def test_first_read_subscribes(fake, env):
+	joint = env.get_object_handle('joint')
+	fake.worlds[env.server_port].object(joint).joint_position = 0.5
+	fake.reset_counters()
+	assert env.obj_get_joint_angle(joint) == 0.5
+	# Subscription, buffer read, one ping for the first reply, buffer read
+	assert fake.calls['simxGetJointPosition'] == 3
+	assert fake.calls['simxGetPingTime'] == 1
+	assert ('simxGetJointPosition', joint) in env.subscriptions
+	fake.reset_counters()
+	assert env.obj_get_joint_angle(joint) == 0.5
+	assert fake.calls['simxGetJointPosition'] == 1
+	assert fake.round_trips == 0
+	assert not fake.errors
+
+def test_novalue_retries_are_bounded(fake, env, monkeypatch):
+	joint = env.get_object_handle('joint')
+	env.stream_wait_attempts = 3
+	# The server never answers
+	monkeypatch.setattr(fake, 'deliver', lambda client, replies: None)
+	fake.reset_counters()
+	with pytest.raises(RuntimeError):
+		env.obj_get_joint_angle(joint)
+	assert fake.calls['simxGetPingTime'] == 3
+	assert fake.calls['simxGetJointPosition'] == 1 + 1 + 3
+
+def test_stale_streams_read_blocking(fake, env):
+	joint = env.get_object_handle('joint')
+	world = fake.worlds[env.server_port]
+	world.object(joint).joint_position = 0.5
+	env.obj_get_joint_angle(joint)
+	# As after restore_snapshot: the buffer holds values from before the restore
+	world.object(joint).joint_position = 1.0
+	env.stale_streams = True
+	fake.reset_counters()
+	assert env.obj_get_joint_angle(joint) == 1.0
+	assert fake.round_trips == 1
+	assert fake.calls['simxGetPingTime'] == 0
+	assert not fake.errors
+
+def test_close_discontinues_subscriptions(fake, env):
+	joint = env.get_object_handle('joint')
+	body = env.get_object_handle('body')
+	env.obj_get_joint_angle(joint)
+	env.obj_get_position(body)
+	env.obj_get_velocity(body)
+	client = fake.clients[env.cID]
+	assert len(client.subscriptions) == 3
+	fake.reset_counters()
+	env.close()
+	assert client.subscriptions == {}
+	assert env.subscriptions == {}
+	assert fake.calls['simxGetJointPosition'] == 1
+	assert fake.calls['simxGetObjectPosition'] == 1
+	assert fake.calls['simxGetObjectVelocity'] == 1
+	assert not fake.errors
+
+def test_snapshot_restores_joint_targets(fake, env):
+	world = fake.worlds[env.server_port]
+	body = env.get_object_handle('body')
+	joint = env.get_object_handle('joint')
+	env.obj_set_velocity(joint, 0.5)
+	env.snapshot_script = 'body'
+	env.snapshot_handles = [body, joint]
+	env.reset_simulation()
+	assert env.snapshot is not None
+	env.obj_set_velocity(joint, 2.0)
+	world.object(body).lin_vel = np.array([1.0, 0.0, 0.0])
+	for _ in range(3):
+		env.step_simulation()
+	env.reset_simulation()
+	assert world.object(joint).joint_target == 0.5
+	assert world.object(joint).joint_position == 0.0
+	assert list(world.object(body).position) == [0.0, 0.0, 1.0]
+	assert env.stale_streams
+	env.step_simulation()
+	assert world.object(joint).joint_position == pytest.approx(0.5*world.dt)
+	assert not fake.errors
+
+def test_server_step_ends_stale_streams(fake, env):
+	body = env.get_object_handle('body')
+	joint = env.get_object_handle('joint')
+	env.setup_server_step('body', [joint], [(body, 'position')])
+	env.start_simulation()
+	env.stale_streams = True
+	assert env.server_step([1.0]).tolist() == [0.0, 0.0, 1.0]
+	assert not env.stale_streams
+	assert not fake.errors
+
+def test_trace_from_constructor(fake, tmp_path):
+	path = str(tmp_path / 'trace_{port}.json')
+	env = VrepEnv('127.0.0.1', 19997, scene_path='scene.ttt', trace=path)
+	env.close()
+	with open(path.format(port=19997)) as f:
+		names = [event['name'] for event in json.load(f)['traceEvents']]
+	assert names.index('connect') < names.index('load_scene')
+	assert 'simxStart' in names and 'simxLoadScene' in names
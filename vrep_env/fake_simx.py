@@ -0,0 +1,956 @@
+"""In-process stand-in for the remoteApi library, to measure client-side costs
+(calls, round trips, marshaling) and to run envs without V-REP:
+
+	from vrep_env import fake_simx
+	fake = fake_simx.install(latency=0.001)
+	env = HopperVrepEnv()
+	...
+	print(fake.calls, fake.round_trips)
+	fake_simx.uninstall()
+
+The simx* methods of FakeRemoteApi are bound to the same ctypes prototypes as the
+library (vrep.bindBackend), so arguments are marshaled exactly as for V-REP.
+Every server port is a FakeWorld: objects are created on first lookup by name,
+joints follow their targets and bodies move with their velocities at each step.
+Operation modes behave like the real ones: blocking calls wait one round trip
+(latency seconds) and streamed replies reach the input buffer at the next round
+trip. As with V-REP, the trigger is acknowledged before the step runs, so the
+values of a step only come with a later round trip (e.g. a ping).
+"""
+
+from vrep_env import vrep
+from vrep_env import vrep_env
+
+import copy
+import time
+import functools
+import threading
+import traceback
+import collections
+import ctypes as ct
+import numpy as np
+
+ok      = vrep.simx_return_ok
+novalue = vrep.simx_return_novalue_flag
+
+class RemoteError(Exception):
+	"""Failure on the (fake) server side: unknown object, signal, function..."""
+	pass
+
+def _entry(method):
+	"""Counts the calls of a library entry point. Exceptions cannot cross the
+	ctypes callback, so they become error codes (and are kept in errors).
+	"""
+	@functools.wraps(method)
+	def entry(self, *args):
+		with self.lock:
+			self.calls[method.__name__] += 1
+			try:
+				return method(self, *args)
+			except RemoteError:
+				return vrep.simx_return_remote_error_flag
+			except Exception:
+				self.errors.append(traceback.format_exc())
+				return vrep.simx_return_local_error_flag
+	return entry
+
+def _string(c_string):
+	return ct.string_at(c_string).decode('utf-8')
+
+def _write(pointer, values):
+	for i, value in enumerate(values):
+		pointer[i] = value
+
+def _size(value):
+	"""Approximate payload of a reply, in bytes.
+	"""
+	if value is None:
+		return 0
+	if isinstance(value, np.ndarray):
+		return value.nbytes
+	if isinstance(value, (bytes, bytearray, str)):
+		return len(value)
+	if isinstance(value, (tuple, list)):
+		return sum(_size(v) for v in value)
+	return 4
+
+class FakeObject(object):
+	def __init__(self, handle, name, object_type):
+		self.handle = handle
+		self.name = name
+		self.object_type = object_type
+		self.parent = -1
+		self.position    = np.array([0.0, 0.0, 1.0])
+		self.orientation = np.zeros(3)
+		self.lin_vel     = np.zeros(3)
+		self.ang_vel     = np.zeros(3)
+		self.joint_position = 0.0
+		self.joint_target   = 0.0
+		self.joint_control  = 'velocity'
+		self.joint_force    = 0.0
+		self.resolution = (64, 64)
+
+class FakeWorld(object):
+	"""State of one fake server.
+	"""
+	def __init__(self, port, dt):
+		self.port = port
+		self.dt = dt
+		self.objects = collections.OrderedDict() # handle -> FakeObject
+		self.handles = {}                        # name -> handle
+		self.next_handle = 10
+		self.initial_objects = None
+		self.running = False
+		self.synchronous = False
+		self.sim_time = 0 # ms
+		self.steps = 0
+		self.scene_id = 1
+		self.signals = {}
+		self.step_config = None # of vrep_env_step_setup
+		self.parameters = {
+			('bool' , vrep.sim_boolparam_headless): 1,
+		}
+
+	def add_object(self, name, object_type=None):
+		if object_type is None:
+			# Good enough for scenes named like the example envs
+			if 'joint' in name:
+				object_type = vrep.sim_object_joint_type
+			elif 'camera' in name or 'sensor' in name:
+				object_type = vrep.sim_object_visionsensor_type
+			else:
+				object_type = vrep.sim_object_shape_type
+		handle = self.next_handle
+		self.next_handle += 1
+		self.objects[handle] = FakeObject(handle, name, object_type)
+		self.handles[name] = handle
+		return self.objects[handle]
+
+	def object(self, handle):
+		if handle not in self.objects:
+			raise RemoteError('Unknown object handle '+str(handle))
+		return self.objects[handle]
+
+	def frame(self, relative_to):
+		"""Position and orientation of a reference frame.
+		"""
+		if relative_to in (-1, vrep.sim_handle_parent):
+			# Objects have no parents
+			return np.zeros(3), np.zeros(3)
+		frame = self.object(relative_to)
+		return frame.position, frame.orientation
+
+	def step(self):
+		for o in self.objects.values():
+			if o.object_type == vrep.sim_object_joint_type:
+				if o.joint_control == 'velocity':
+					o.joint_position += o.joint_target*self.dt
+				else:
+					o.joint_position = o.joint_target
+			o.position    = o.position    + o.lin_vel*self.dt
+			o.orientation = o.orientation + o.ang_vel*self.dt
+		self.sim_time += int(round(1000*self.dt))
+		self.steps += 1
+
+	def start(self):
+		self.initial_objects = copy.deepcopy(self.objects)
+		self.running = True
+		self.sim_time = 0
+		# Child scripts start over
+		self.step_config = None
+
+	def stop(self):
+		if self.initial_objects is not None:
+			# Objects looked up during the simulation stay in the scene
+			self.objects.update(self.initial_objects)
+			self.initial_objects = None
+		self.running = False
+		self.sim_time = 0
+
+	def group_data(self, object_type, data_type):
+		"""(handles, ints, floats, names) as returned by simxGetObjectGroupData.
+		"""
+		objects = [o for o in self.objects.values()
+			if object_type == vrep.sim_appobj_object_type or o.object_type == object_type]
+		ints, floats, names = [], [], []
+		for o in objects:
+			self.object_data(o, data_type, ints, floats, names)
+		return (np.array([o.handle for o in objects], dtype='int32'),
+			np.array(ints, dtype='int32'), np.array(floats, dtype='float32'), names)
+
+	def object_data(self, o, data_type, ints, floats, names):
+		"""Appends the simxGetObjectGroupData values of one object.
+		"""
+		if data_type == 0:
+			names.append(o.name)
+		elif data_type == 1:
+			ints.append(o.object_type)
+		elif data_type == 2:
+			ints.append(o.parent)
+		elif data_type in (3, 4):
+			floats += list(o.position)
+		elif data_type in (5, 6):
+			floats += list(o.orientation)
+		elif data_type in (9, 10):
+			floats += list(o.position) + list(o.orientation)
+		elif data_type == 15:
+			floats += [o.joint_position, o.joint_force]
+		elif data_type == 17:
+			floats += list(o.lin_vel)
+		elif data_type == 18:
+			floats += list(o.ang_vel)
+		elif data_type == 19:
+			floats += list(o.lin_vel) + list(o.ang_vel)
+		else:
+			raise RemoteError('Unsupported group data type '+str(data_type))
+
+class FakeClient(object):
+	"""Connection state of one client ID.
+	"""
+	def __init__(self, cID, world):
+		self.cID = cID
+		self.world = world
+		self.subscriptions = {} # key -> function computing the reply
+		self.oneshots = {}      # key -> function computing the reply, sent once
+		self.inbox = {}         # key -> (reply, simulation time)
+		self.paused = False
+		self.held = 0
+		self.out_message_id = 0
+		self.in_message_id = 0
+		self.server_state = 0
+		self.server_time = 0
+		self.scene_id = world.scene_id
+		self.last_cmd_time = 0
+		self.buffers = {}       # C buffers handed out, valid until the next similar call
+
+class FakeRemoteApi(object):
+	"""Implements the remoteApi entry points on FakeWorlds (one per port).
+	Counters: calls (by function), round_trips, messages_out/in, bytes_out/in.
+	"""
+	def __init__(self, latency=0.0, dt=0.05, create_missing=True):
+		self.latency = latency # seconds per round trip
+		self.dt = dt
+		self.create_missing = create_missing
+		self.lock = threading.Lock()
+		self.worlds = {}
+		self.clients = {}
+		self.next_cID = 0
+		# Emulation of the functions of vrep_env.lua
+		self.script_functions = {
+			'vrep_env_capture'   : self.script_capture,
+			'vrep_env_restore'   : self.script_restore,
+			'vrep_env_step_setup': self.script_step_setup,
+			'vrep_env_step'      : self.script_step,
+		}
+		self.reset_counters()
+
+	def reset_counters(self):
+		self.calls = collections.Counter()
+		self.round_trips = 0
+		self.messages_out = 0
+		self.messages_in = 0
+		self.bytes_out = 0
+		self.bytes_in = 0
+		self.errors = []
+
+	def world(self, port):
+		if port not in self.worlds:
+			self.worlds[port] = FakeWorld(port, self.dt)
+		return self.worlds[port]
+
+	def client(self, cID):
+		if cID not in self.clients:
+			raise RemoteError('Unknown client ID '+str(cID))
+		return self.clients[cID]
+
+	def handle(self, world, name):
+		if name not in world.handles:
+			if not self.create_missing:
+				raise RemoteError('Unknown object '+name)
+			world.add_object(name)
+		return world.handles[name]
+
+	# messages
+
+	def send(self, client, nbytes=0):
+		"""One command going out, held back while communication is paused.
+		"""
+		self.bytes_out += vrep.SIMX_SUBHEADER_SIZE + nbytes
+		if client.paused:
+			client.held += 1
+		else:
+			self.message_out(client)
+
+	def message_out(self, client):
+		self.messages_out += 1
+		self.bytes_out += vrep.SIMX_HEADER_SIZE
+		client.out_message_id += 1
+
+	def round_trip(self, client):
+		"""Waits for the server: held commands go out and the replies of all
+		subscriptions (and pending oneshot getters) reach the input buffer.
+		"""
+		if client.held:
+			self.message_out(client)
+			client.held = 0
+		if self.latency:
+			# Other clients may run meanwhile
+			self.lock.release()
+			try:
+				time.sleep(self.latency)
+			finally:
+				self.lock.acquire()
+		self.round_trips += 1
+		self.deliver(client, list(client.subscriptions.items()) + list(client.oneshots.items()))
+		client.oneshots = {}
+
+	def deliver(self, client, replies):
+		"""One message from the server with the given (key, compute) replies.
+		"""
+		world = client.world
+		self.messages_in += 1
+		self.bytes_in += vrep.SIMX_HEADER_SIZE
+		for key, compute in replies:
+			try:
+				reply = compute()
+			except RemoteError:
+				reply = RemoteError
+			client.inbox[key] = (reply, world.sim_time)
+			self.bytes_in += vrep.SIMX_SUBHEADER_SIZE + _size(reply)
+		client.in_message_id = client.out_message_id
+		client.server_state = 1 if world.running else 0
+		client.server_time = int(1000*time.time()) & 0x7fffffff
+		client.scene_id = world.scene_id
+
+	def publish(self, world):
+		"""The server sends the streamed data after each simulation step.
+		"""
+		for client in list(self.clients.values()):
+			if client.world is world and client.subscriptions:
+				self.deliver(client, list(client.subscriptions.items()))
+
+	def get(self, client, key, operationMode, compute, nbytes=8):
+		"""Reply of a getter in the given operation mode: (return code, reply or None).
+		"""
+		mode = operationMode & 0xff0000
+		if mode == vrep.simx_opmode_blocking:
+			self.send(client, nbytes)
+			self.round_trip(client)
+			reply = compute()
+			self.bytes_in += vrep.SIMX_SUBHEADER_SIZE + _size(reply)
+			client.last_cmd_time = client.world.sim_time
+			return ok, reply
+		elif mode in (vrep.simx_opmode_streaming, vrep.simx_opmode_streaming_split):
+			if key not in client.subscriptions:
+				client.subscriptions[key] = compute
+				self.send(client, nbytes)
+		elif mode in (vrep.simx_opmode_oneshot, vrep.simx_opmode_oneshot_split):
+			client.oneshots[key] = compute
+			self.send(client, nbytes)
+		elif mode == vrep.simx_opmode_discontinue:
+			client.subscriptions.pop(key, None)
+			client.inbox.pop(key, None)
+			self.send(client, nbytes)
+			return ok, None
+		elif mode == vrep.simx_opmode_remove:
+			client.inbox.pop(key, None)
+			return ok, None
+		elif mode != vrep.simx_opmode_buffer:
+			return vrep.simx_return_illegal_opmode_flag, None
+		if key not in client.inbox:
+			return novalue, None
+		reply, client.last_cmd_time = client.inbox[key]
+		if reply is RemoteError:
+			return vrep.simx_return_remote_error_flag, None
+		return ok, reply
+
+	def set(self, client, operationMode, apply, nbytes=8):
+		apply()
+		self.send(client, nbytes)
+		if operationMode & 0xff0000 == vrep.simx_opmode_blocking:
+			self.round_trip(client)
+		return ok
+
+	def keep(self, client, name, c_type, values):
+		"""C copy of values, valid until the next call using the same name.
+		"""
+		data = np.ascontiguousarray(values, dtype=np.dtype(c_type)).tobytes()
+		buffer = (c_type*max(1, len(data)//ct.sizeof(c_type))).from_buffer_copy(data or b'\0'*ct.sizeof(c_type))
+		client.buffers[name] = buffer
+		return ct.cast(buffer, ct.POINTER(c_type))
+
+	# connection
+
+	@_entry
+	def simxStart(self, connectionAddress, connectionPort, waitUntilConnected, doNotReconnectOnceDisconnected, timeOutInMs, commThreadCycleInMs):
+		cID = self.next_cID
+		self.next_cID += 1
+		self.clients[cID] = FakeClient(cID, self.world(connectionPort))
+		return cID
+
+	@_entry
+	def simxFinish(self, clientID):
+		if clientID == -1:
+			self.clients = {}
+		else:
+			self.clients.pop(clientID, None)
+
+	@_entry
+	def simxGetConnectionId(self, clientID):
+		return clientID if clientID in self.clients else -1
+
+	@_entry
+	def simxGetPingTime(self, clientID, pingTime):
+		client = self.client(clientID)
+		t_start = time.time()
+		self.send(client)
+		self.round_trip(client)
+		pingTime[0] = int(1000*(time.time() - t_start))
+		return ok
+
+	@_entry
+	def simxGetLastCmdTime(self, clientID):
+		return self.client(clientID).last_cmd_time
+
+	@_entry
+	def simxPauseCommunication(self, clientID, enable):
+		client = self.client(clientID)
+		client.paused = bool(enable)
+		if not client.paused and client.held:
+			self.message_out(client)
+			client.held = 0
+		return 0
+
+	@_entry
+	def simxGetInMessageInfo(self, clientID, infoType, info):
+		client = self.client(clientID)
+		info[0] = {
+			vrep.simx_headeroffset_message_id  : client.in_message_id,
+			vrep.simx_headeroffset_server_time : client.server_time,
+			vrep.simx_headeroffset_scene_id    : client.scene_id,
+			vrep.simx_headeroffset_server_state: client.server_state,
+		}.get(infoType, 0)
+		return 1
+
+	@_entry
+	def simxGetOutMessageInfo(self, clientID, infoType, info):
+		client = self.client(clientID)
+		info[0] = {
+			vrep.simx_headeroffset_message_id : client.out_message_id,
+			vrep.simx_headeroffset_client_time: int(1000*time.time()) & 0x7fffffff,
+		}.get(infoType, 0)
+		return 1
+
+	@_entry
+	def simxReleaseBuffer(self, buffer):
+		pass
+
+	# simulation
+
+	@_entry
+	def simxSynchronous(self, clientID, enable):
+		world = self.client(clientID).world
+		return self.set(self.client(clientID), vrep.simx_opmode_blocking,
+			lambda: setattr(world, 'synchronous', bool(enable)))
+
+	@_entry
+	def simxSynchronousTrigger(self, clientID):
+		client = self.client(clientID)
+		# The server acknowledges the trigger, then runs the step
+		self.send(client)
+		self.round_trip(client)
+		client.last_cmd_time = client.world.sim_time
+		if client.world.running:
+			# Streamed values of the step follow with the next round trip
+			client.world.step()
+		return ok
+
+	@_entry
+	def simxStartSimulation(self, clientID, operationMode):
+		client = self.client(clientID)
+		return self.set(client, operationMode, client.world.start)
+
+	@_entry
+	def simxStopSimulation(self, clientID, operationMode):
+		client = self.client(clientID)
+		return self.set(client, operationMode, client.world.stop)
+
+	@_entry
+	def simxPauseSimulation(self, clientID, operationMode):
+		client = self.client(clientID)
+		return self.set(client, operationMode, lambda: setattr(client.world, 'running', False))
+
+	@_entry
+	def simxLoadScene(self, clientID, scenePathAndName, options, operationMode):
+		client = self.client(clientID)
+		def load():
+			client.world.scene_id += 1
+		return self.set(client, operationMode, load, len(ct.string_at(scenePathAndName)))
+
+	@_entry
+	def simxCloseScene(self, clientID, operationMode):
+		client = self.client(clientID)
+		def close():
+			client.world.scene_id += 1
+		return self.set(client, operationMode, close)
+
+	@_entry
+	def simxAddStatusbarMessage(self, clientID, message, operationMode):
+		return self.set(self.client(clientID), operationMode, lambda: None, len(ct.string_at(message)))
+
+	# objects
+
+	@_entry
+	def simxGetObjectHandle(self, clientID, objectName, handle, operationMode):
+		client = self.client(clientID)
+		name = _string(objectName)
+		ret, value = self.get(client, ('handle', name), operationMode,
+			lambda: self.handle(client.world, name), len(name))
+		if value is not None:
+			handle[0] = value
+		return ret
+
+	@_entry
+	def simxGetCollisionHandle(self, clientID, collisionObjectName, handle, operationMode):
+		client = self.client(clientID)
+		name = _string(collisionObjectName)
+		ret, value = self.get(client, ('collision', name), operationMode,
+			lambda: self.handle(client.world, name), len(name))
+		if value is not None:
+			handle[0] = value
+		return ret
+
+	@_entry
+	def simxReadCollision(self, clientID, collisionObjectHandle, collisionState, operationMode):
+		ret, value = self.get(self.client(clientID), ('collision', collisionObjectHandle), operationMode,
+			lambda: 0)
+		if value is not None:
+			collisionState[0] = value
+		return ret
+
+	@_entry
+	def simxGetObjectPosition(self, clientID, objectHandle, relativeToObjectHandle, position, operationMode):
+		world = self.client(clientID).world
+		def compute():
+			frame_position, _ = world.frame(relativeToObjectHandle)
+			return world.object(objectHandle).position - frame_position
+		ret, value = self.get(self.client(clientID), ('position', objectHandle, relativeToObjectHandle),
+			operationMode, compute)
+		if value is not None:
+			_write(position, value)
+		return ret
+
+	@_entry
+	def simxSetObjectPosition(self, clientID, objectHandle, relativeToObjectHandle, position, operationMode):
+		world = self.client(clientID).world
+		value = np.array(position[0:3])
+		def apply():
+			frame_position, _ = world.frame(relativeToObjectHandle)
+			world.object(objectHandle).position = frame_position + value
+		return self.set(self.client(clientID), operationMode, apply, 20)
+
+	@_entry
+	def simxGetObjectOrientation(self, clientID, objectHandle, relativeToObjectHandle, eulerAngles, operationMode):
+		world = self.client(clientID).world
+		def compute():
+			_, frame_orientation = world.frame(relativeToObjectHandle)
+			return world.object(objectHandle).orientation - frame_orientation
+		ret, value = self.get(self.client(clientID), ('orientation', objectHandle, relativeToObjectHandle),
+			operationMode, compute)
+		if value is not None:
+			_write(eulerAngles, value)
+		return ret
+
+	@_entry
+	def simxSetObjectOrientation(self, clientID, objectHandle, relativeToObjectHandle, eulerAngles, operationMode):
+		world = self.client(clientID).world
+		value = np.array(eulerAngles[0:3])
+		def apply():
+			_, frame_orientation = world.frame(relativeToObjectHandle)
+			world.object(objectHandle).orientation = frame_orientation + value
+		return self.set(self.client(clientID), operationMode, apply, 20)
+
+	@_entry
+	def simxGetObjectVelocity(self, clientID, objectHandle, linearVel, angularVel, operationMode):
+		world = self.client(clientID).world
+		def compute():
+			o = world.object(objectHandle)
+			return o.lin_vel.copy(), o.ang_vel.copy()
+		ret, value = self.get(self.client(clientID), ('velocity', objectHandle), operationMode, compute)
+		if value is not None:
+			_write(linearVel , value[0])
+			_write(angularVel, value[1])
+		return ret
+
+	@_entry
+	def simxGetObjectGroupData(self, clientID, objectType, dataType, handlesCount, handles, intDataCount, intData, floatDataCount, floatData, stringDataCount, stringData, operationMode):
+		client = self.client(clientID)
+		ret, value = self.get(client, ('group', objectType, dataType), operationMode,
+			lambda: client.world.group_data(objectType, dataType))
+		if value is not None:
+			object_handles, ints, floats, names = value
+			strings = b''.join(name.encode('utf-8')+b'\0' for name in names)
+			handlesCount[0]    = len(object_handles)
+			handles[0]         = self.keep(client, 'group_handles', ct.c_int32, object_handles)
+			intDataCount[0]    = len(ints)
+			intData[0]         = self.keep(client, 'group_ints'   , ct.c_int32, ints)
+			floatDataCount[0]  = len(floats)
+			floatData[0]       = self.keep(client, 'group_floats' , ct.c_float, floats)
+			stringDataCount[0] = len(names)
+			stringData[0]      = self.keep(client, 'group_strings', ct.c_char , np.frombuffer(strings, dtype='S1'))
+		return ret
+
+	# joints
+
+	@_entry
+	def simxGetJointPosition(self, clientID, jointHandle, position, operationMode):
+		world = self.client(clientID).world
+		ret, value = self.get(self.client(clientID), ('joint_position', jointHandle), operationMode,
+			lambda: world.object(jointHandle).joint_position)
+		if value is not None:
+			position[0] = value
+		return ret
+
+	@_entry
+	def simxSetJointPosition(self, clientID, jointHandle, position, operationMode):
+		world = self.client(clientID).world
+		return self.set(self.client(clientID), operationMode,
+			lambda: setattr(world.object(jointHandle), 'joint_position', position))
+
+	@_entry
+	def simxSetJointTargetVelocity(self, clientID, jointHandle, targetVelocity, operationMode):
+		world = self.client(clientID).world
+		def apply():
+			joint = world.object(jointHandle)
+			joint.joint_control = 'velocity'
+			joint.joint_target = targetVelocity
+		return self.set(self.client(clientID), operationMode, apply)
+
+	@_entry
+	def simxSetJointTargetPosition(self, clientID, jointHandle, targetPosition, operationMode):
+		world = self.client(clientID).world
+		def apply():
+			joint = world.object(jointHandle)
+			joint.joint_control = 'position'
+			joint.joint_target = targetPosition
+		return self.set(self.client(clientID), operationMode, apply)
+
+	@_entry
+	def simxGetJointForce(self, clientID, jointHandle, force, operationMode):
+		world = self.client(clientID).world
+		ret, value = self.get(self.client(clientID), ('joint_force', jointHandle), operationMode,
+			lambda: world.object(jointHandle).joint_force)
+		if value is not None:
+			force[0] = value
+		return ret
+
+	@_entry
+	def simxSetJointForce(self, clientID, jointHandle, force, operationMode):
+		world = self.client(clientID).world
+		return self.set(self.client(clientID), operationMode,
+			lambda: setattr(world.object(jointHandle), 'joint_force', force))
+
+	# sensors
+
+	@_entry
+	def simxReadForceSensor(self, clientID, forceSensorHandle, state, forceVector, torqueVector, operationMode):
+		world = self.client(clientID).world
+		ret, value = self.get(self.client(clientID), ('force_sensor', forceSensorHandle), operationMode,
+			lambda: world.object(forceSensorHandle) and 1)
+		if value is not None:
+			state[0] = value
+			_write(forceVector , [0.0, 0.0, 0.0])
+			_write(torqueVector, [0.0, 0.0, 0.0])
+		return ret
+
+	@_entry
+	def simxGetVisionSensorImage(self, clientID, sensorHandle, resolution, image, options, operationMode):
+		client = self.client(clientID)
+		world = client.world
+		bytes_per_pixel = 1 if options & 1 else 3
+		def compute():
+			sensor = world.object(sensorHandle)
+			resX, resY = sensor.resolution
+			return sensor.resolution, np.full(resX*resY*bytes_per_pixel, world.steps % 256, dtype='uint8')
+		ret, value = self.get(client, ('image', sensorHandle, options), operationMode, compute)
+		if value is not None:
+			_write(resolution, value[0])
+			image[0] = ct.cast(self.keep(client, 'image', ct.c_ubyte, value[1]), ct.POINTER(ct.c_byte))
+		return ret
+
+	@_entry
+	def simxGetVisionSensorDepthBuffer(self, clientID, sensorHandle, resolution, buffer, operationMode):
+		client = self.client(clientID)
+		world = client.world
+		def compute():
+			sensor = world.object(sensorHandle)
+			resX, resY = sensor.resolution
+			return sensor.resolution, np.full(resX*resY, 0.5, dtype='float32')
+		ret, value = self.get(client, ('depth', sensorHandle), operationMode, compute)
+		if value is not None:
+			_write(resolution, value[0])
+			buffer[0] = self.keep(client, 'depth', ct.c_float, value[1])
+		return ret
+
+	# signals
+
+	def get_signal(self, clientID, kind, signalName, operationMode):
+		client = self.client(clientID)
+		name = _string(signalName)
+		def compute():
+			if (kind, name) not in client.world.signals:
+				raise RemoteError('Unknown signal '+name)
+			return client.world.signals[(kind, name)]
+		return self.get(client, (kind+'_signal', name), operationMode, compute, len(name))
+
+	def set_signal(self, clientID, kind, signalName, value, operationMode):
+		client = self.client(clientID)
+		name = _string(signalName)
+		return self.set(client, operationMode,
+			lambda: client.world.signals.__setitem__((kind, name), value), len(name)+_size(value))
+
+	def clear_signal(self, clientID, kind, signalName, operationMode):
+		client = self.client(clientID)
+		name = _string(signalName)
+		return self.set(client, operationMode,
+			lambda: client.world.signals.pop((kind, name), None), len(name))
+
+	@_entry
+	def simxGetIntegerSignal(self, clientID, signalName, signalValue, operationMode):
+		ret, value = self.get_signal(clientID, 'int', signalName, operationMode)
+		if value is not None:
+			signalValue[0] = value
+		return ret
+
+	@_entry
+	def simxGetFloatSignal(self, clientID, signalName, signalValue, operationMode):
+		ret, value = self.get_signal(clientID, 'float', signalName, operationMode)
+		if value is not None:
+			signalValue[0] = value
+		return ret
+
+	@_entry
+	def simxGetStringSignal(self, clientID, signalName, signalValue, signalLength, operationMode):
+		ret, value = self.get_signal(clientID, 'string', signalName, operationMode)
+		if value is not None:
+			signalValue[0] = self.keep(self.client(clientID), 'string_signal', ct.c_ubyte,
+				np.frombuffer(value, dtype='uint8'))
+			signalLength[0] = len(value)
+		return ret
+
+	@_entry
+	def simxSetIntegerSignal(self, clientID, signalName, signalValue, operationMode):
+		return self.set_signal(clientID, 'int', signalName, signalValue, operationMode)
+
+	@_entry
+	def simxSetFloatSignal(self, clientID, signalName, signalValue, operationMode):
+		return self.set_signal(clientID, 'float', signalName, signalValue, operationMode)
+
+	@_entry
+	def simxSetStringSignal(self, clientID, signalName, signalValue, signalLength, operationMode):
+		return self.set_signal(clientID, 'string', signalName, ct.string_at(signalValue, signalLength), operationMode)
+
+	@_entry
+	def simxClearIntegerSignal(self, clientID, signalName, operationMode):
+		return self.clear_signal(clientID, 'int', signalName, operationMode)
+
+	@_entry
+	def simxClearFloatSignal(self, clientID, signalName, operationMode):
+		return self.clear_signal(clientID, 'float', signalName, operationMode)
+
+	@_entry
+	def simxClearStringSignal(self, clientID, signalName, operationMode):
+		return self.clear_signal(clientID, 'string', signalName, operationMode)
+
+	# parameters
+
+	def get_parameter(self, clientID, kind, paramIdentifier, operationMode, default):
+		world = self.client(clientID).world
+		def compute():
+			if (kind, paramIdentifier) == ('float', vrep.sim_floatparam_simulation_time_step):
+				return world.dt
+			return world.parameters.get((kind, paramIdentifier), default)
+		return self.get(self.client(clientID), (kind+'_parameter', paramIdentifier), operationMode, compute)
+
+	def set_parameter(self, clientID, kind, paramIdentifier, value, operationMode):
+		world = self.client(clientID).world
+		def apply():
+			if (kind, paramIdentifier) == ('float', vrep.sim_floatparam_simulation_time_step):
+				world.dt = value
+			world.parameters[(kind, paramIdentifier)] = value
+		return self.set(self.client(clientID), operationMode, apply)
+
+	@_entry
+	def simxGetBooleanParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		ret, value = self.get_parameter(clientID, 'bool', paramIdentifier, operationMode, 0)
+		if value is not None:
+			paramValue[0] = value
+		return ret
+
+	@_entry
+	def simxSetBooleanParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		return self.set_parameter(clientID, 'bool', paramIdentifier, paramValue, operationMode)
+
+	@_entry
+	def simxGetIntegerParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		ret, value = self.get_parameter(clientID, 'int', paramIdentifier, operationMode, 0)
+		if value is not None:
+			paramValue[0] = value
+		return ret
+
+	@_entry
+	def simxSetIntegerParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		return self.set_parameter(clientID, 'int', paramIdentifier, paramValue, operationMode)
+
+	@_entry
+	def simxGetFloatingParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		ret, value = self.get_parameter(clientID, 'float', paramIdentifier, operationMode, 0.0)
+		if value is not None:
+			paramValue[0] = value
+		return ret
+
+	@_entry
+	def simxSetFloatingParameter(self, clientID, paramIdentifier, paramValue, operationMode):
+		return self.set_parameter(clientID, 'float', paramIdentifier, paramValue, operationMode)
+
+	@_entry
+	def simxGetArrayParameter(self, clientID, paramIdentifier, paramValues, operationMode):
+		ret, value = self.get_parameter(clientID, 'array', paramIdentifier, operationMode, (0.0, 0.0, 0.0))
+		if value is not None:
+			_write(paramValues, value)
+		return ret
+
+	@_entry
+	def simxSetArrayParameter(self, clientID, paramIdentifier, paramValues, operationMode):
+		return self.set_parameter(clientID, 'array', paramIdentifier, tuple(paramValues[0:3]), operationMode)
+
+	# scripts
+
+	@_entry
+	def simxCallScriptFunction(self, clientID, scriptDescription, options, functionName, inIntCnt, inInt, inFloatCnt, inFloat, inStringCnt, inString, inBufferSize, inBuffer, outIntCnt, outInt, outFloatCnt, outFloat, outStringCnt, outString, outBufferSize, outBuffer, operationMode):
+		client = self.client(clientID)
+		name = _string(functionName)
+		ints   = [inInt[i]   for i in range(inIntCnt)]
+		floats = [inFloat[i] for i in range(inFloatCnt)]
+		strings = []
+		address = ct.cast(inString, ct.c_void_p).value
+		for _ in range(inStringCnt):
+			s = ct.string_at(address)
+			strings.append(s.decode('utf-8'))
+			address += len(s)+1
+		buffer = ct.string_at(inBuffer, inBufferSize)
+		def compute():
+			if name not in self.script_functions:
+				raise RemoteError('Unknown script function '+name)
+			return self.script_functions[name](client.world, ints, floats, strings, buffer)
+		nbytes = 4*(len(ints)+len(floats)) + sum(len(s)+1 for s in strings) + len(buffer)
+		if operationMode & 0xff0000 in (vrep.simx_opmode_oneshot, vrep.simx_opmode_oneshot_split):
+			# Runs when it reaches the server, not at the next round trip of the client
+			try:
+				reply = compute()
+			except RemoteError:
+				reply = RemoteError
+			compute = lambda: reply
+		ret, value = self.get(client, ('script', name), operationMode, compute, nbytes)
+		if value is not None:
+			out_ints, out_floats, out_strings, out_buffer = value
+			strings = b''.join(s.encode('utf-8')+b'\0' for s in out_strings)
+			outIntCnt[0]     = len(out_ints)
+			outInt[0]        = self.keep(client, 'script_ints'   , ct.c_int32, out_ints)
+			outFloatCnt[0]   = len(out_floats)
+			outFloat[0]      = self.keep(client, 'script_floats' , ct.c_float, out_floats)
+			outStringCnt[0]  = len(out_strings)
+			outString[0]     = self.keep(client, 'script_strings', ct.c_char , np.frombuffer(strings, dtype='S1'))
+			outBufferSize[0] = len(out_buffer)
+			outBuffer[0]     = self.keep(client, 'script_buffer' , ct.c_ubyte, np.frombuffer(bytes(out_buffer), dtype='uint8'))
+		return ret
+
+	def script_capture(self, world, ints, floats, strings, buffer):
+		"""vrep_env_capture of vrep_env.lua. Joints have a single target, used as
+		target position or velocity depending on their control.
+		"""
+		out = []
+		for handle in ints:
+			o = world.object(handle)
+			out += list(o.position) + list(o.orientation)
+			if o.object_type == vrep.sim_object_joint_type:
+				target_position = o.joint_target if o.joint_control == 'position' else o.joint_position
+				target_velocity = o.joint_target if o.joint_control == 'velocity' else 0.0
+				out += [o.joint_position, target_position, target_velocity]
+			else:
+				out += [0.0, 0.0, 0.0]
+		return [], out, [], b''
+
+	def script_restore(self, world, ints, floats, strings, buffer):
+		"""vrep_env_restore of vrep_env.lua
+		"""
+		for i, handle in enumerate(ints):
+			o = world.object(handle)
+			o.position    = np.array(floats[9*i  :9*i+3])
+			o.orientation = np.array(floats[9*i+3:9*i+6])
+			o.lin_vel = np.zeros(3)
+			o.ang_vel = np.zeros(3)
+			if o.object_type == vrep.sim_object_joint_type:
+				o.joint_position = floats[9*i+6]
+				if o.joint_control == 'position':
+					o.joint_target = floats[9*i+7]
+				elif o.joint_control == 'velocity':
+					o.joint_target = floats[9*i+8]
+		return [], [], [], b''
+
+	def script_step_setup(self, world, ints, floats, strings, buffer):
+		"""vrep_env_step_setup of vrep_env.lua
+		"""
+		control, substeps, every_substep, n = ints[0:4]
+		actuators = ints[4:4+n]
+		i = 4+n
+		observed = [(ints[i+1+2*k], ints[i+2+2*k]) for k in range(ints[i])]
+		world.step_config = (['velocity', 'position', 'force'][control], substeps, bool(every_substep),
+			actuators, observed)
+		return [], [], [], b''
+
+	def script_step(self, world, ints, floats, strings, buffer):
+		"""vrep_env_step of vrep_env.lua, up to the observation signal sent after the
+		last substep: the client waits a single round trip.
+		"""
+		if not world.running or world.step_config is None:
+			raise RemoteError('vrep_env_step_setup was not called')
+		control, substeps, every_substep, actuators, observed = world.step_config
+		actions = np.frombuffer(buffer, dtype='<f4')
+		for handle, action in zip(actuators, actions):
+			o = world.object(handle)
+			if control == 'force':
+				o.joint_force = float(action)
+			else:
+				o.joint_control = control
+				o.joint_target = float(action)
+		if self.latency:
+			self.lock.release()
+			try:
+				time.sleep(self.latency)
+			finally:
+				self.lock.acquire()
+		self.round_trips += 1
+		data = [ints[0], 0.0]
+		for i in range(substeps):
+			world.step()
+			if every_substep or i == substeps-1:
+				for handle, data_type in observed:
+					world.object_data(world.object(handle), data_type, [], data, [])
+		data[1] = world.sim_time/1000.0
+		world.signals[('string', 'vrep_env_observation')] = np.array(data, dtype='<f4').tobytes()
+		self.publish(world)
+		return [], [], [], b''
+
+def install(**kwargs):
+	"""Routes the remote API to a new FakeRemoteApi(**kwargs) and returns it.
+	"""
+	fake = FakeRemoteApi(**kwargs)
+	vrep.bindBackend(fake)
+	# Cached handles belong to the previous servers
+	vrep_env.handle_registry.clear()
+	return fake
+
+def uninstall():
+	vrep.bindBackend(None)
+	vrep_env.handle_registry.clear()
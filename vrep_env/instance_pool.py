@@ -0,0 +1,195 @@
+"""Launching, health checking and recycling of headless V-REP instances.
+"""
+
+import os
+import time
+import signal
+import socket
+import contextlib
+import subprocess
+
+def find_free_port():
+	with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+		s.bind(('', 0))
+		return s.getsockname()[1]
+
+def port_is_open(addr, port, timeout=0.1):
+	try:
+		with contextlib.closing(socket.create_connection((addr, port), timeout=timeout)):
+			return True
+	except (socket.error, socket.timeout):
+		return False
+
+class VrepInstance(object):
+	"""One V-REP process serving the remote API on one port.
+	"""
+	def __init__(self, process, addr, port):
+		self.process = process
+		self.addr = addr
+		self.port = port
+	
+	def alive(self):
+		return self.process.poll() is None
+	
+	def stop(self, force=False):
+		"""Sends SIGTERM (SIGKILL if force) to the process group: vrep.sh starts V-REP
+		as a child process. Without process groups (Windows), stops the process only.
+		"""
+		if not hasattr(os, 'killpg'):
+			if force:
+				self.process.kill()
+			else:
+				self.process.terminate()
+			return
+		try:
+			os.killpg(self.process.pid, signal.SIGKILL if force else signal.SIGTERM)
+		except ProcessLookupError:
+			# The whole group exited meanwhile
+			pass
+	
+	def terminate(self, timeout=10.0):
+		if not self.alive():
+			return
+		self.stop()
+		try:
+			self.process.wait(timeout)
+		except subprocess.TimeoutExpired:
+			self.stop(force=True)
+			self.process.wait()
+
+class VrepInstancePool(object):
+	"""Launches size headless V-REP instances, each with a remote API server on a
+	free port, and hands them out to envs. Instances that died are relaunched
+	when acquired. executable defaults to $VREP_PATH/vrep.sh; any program
+	accepting the same arguments (e.g. a local stand-in) can be used instead.
+	"""
+	def __init__(
+		self,
+		size,
+		scene_path=None,
+		executable=None,
+		addr='127.0.0.1',
+		startup_timeout=60.0,
+		extra_args=(),
+	):
+		if executable is None:
+			executable = os.path.join(os.environ['VREP_PATH'], 'vrep.sh')
+		self.size = size
+		self.scene_path = scene_path
+		self.executable = executable
+		self.addr = addr
+		self.startup_timeout = startup_timeout
+		self.extra_args = list(extra_args)
+		
+		self.instances = []
+		self.idle = []
+		
+		# Launch everything first, then wait: instances start in parallel
+		try:
+			for _ in range(size):
+				self.instances.append(self.launch())
+			for instance in self.instances:
+				self.wait_ready(instance)
+		except BaseException:
+			# Also on KeyboardInterrupt: no instance may outlive a failed pool
+			self.close()
+			raise
+		self.idle = list(self.instances)
+	
+	def command(self, port):
+		# -h: headless, -g: remote API server on port (debug off, sync mode pre-enabled)
+		cmd = [self.executable, '-h', '-gREMOTEAPISERVERSERVICE_'+str(port)+'_FALSE_TRUE']
+		cmd += self.extra_args
+		if self.scene_path is not None:
+			cmd += [self.scene_path]
+		return cmd
+	
+	def launch(self):
+		port = find_free_port()
+		process = subprocess.Popen(self.command(port),
+			stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+			start_new_session=True)
+		return VrepInstance(process, self.addr, port)
+	
+	def wait_ready(self, instance):
+		"""Probes the remote API port until it accepts connections.
+		"""
+		t_start = time.time()
+		while not port_is_open(instance.addr, instance.port):
+			if not instance.alive():
+				raise RuntimeError('V-REP exited with code '+str(instance.process.returncode)+
+					' while starting on port '+str(instance.port)+'.')
+			if time.time() - t_start > self.startup_timeout:
+				instance.terminate()
+				raise RuntimeError('V-REP did not open port '+str(instance.port)+
+					' within '+str(self.startup_timeout)+' s.')
+			time.sleep(0.05)
+	
+	def relaunch(self, instance):
+		"""Replaces instance with a new one. If that one fails to start, it is
+		terminated and instance stays in the pool, dead, to be relaunched later.
+		"""
+		instance.terminate()
+		new_instance = self.launch()
+		try:
+			self.wait_ready(new_instance)
+		except BaseException:
+			new_instance.terminate()
+			raise
+		self.instances[self.instances.index(instance)] = new_instance
+		return new_instance
+	
+	def acquire(self):
+		"""Returns a ready idle instance, relaunching it first if it died.
+		"""
+		if not self.idle:
+			raise RuntimeError('All '+str(self.size)+' V-REP instances are in use.')
+		instance = self.idle.pop(0)
+		if not instance.alive():
+			try:
+				instance = self.relaunch(instance)
+			except BaseException:
+				# Still idle: a later acquire or recycle relaunches it
+				self.idle.append(instance)
+				raise
+		return instance
+	
+	def release(self, instance):
+		if instance in self.instances and instance not in self.idle:
+			self.idle.append(instance)
+	
+	def recycle(self):
+		"""Relaunches every instance that died, idle or not. Returns the new ones.
+		"""
+		dead = [instance for instance in self.instances if not instance.alive()]
+		relaunched = []
+		for instance in dead:
+			new_instance = self.relaunch(instance)
+			if instance in self.idle:
+				self.idle[self.idle.index(instance)] = new_instance
+			relaunched.append(new_instance)
+		return relaunched
+	
+	def make_env(self, env_class, **kwargs):
+		"""Constructs env_class connected to an acquired instance.
+		The instance goes back to the pool with release(env.vrep_instance).
+		"""
+		instance = self.acquire()
+		if self.scene_path is not None:
+			# The instance already opened the scene
+			kwargs.setdefault('scene_path', None)
+		env = env_class(server_addr=instance.addr, server_port=instance.port, **kwargs)
+		env.vrep_instance = instance
+		return env
+	
+	def close(self):
+		for instance in self.instances:
+			instance.terminate()
+		self.instances = []
+		self.idle = []
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *exc_info):
+		self.close()
@@ -0,0 +1,315 @@
+from vrep_env import vrep
+
+import time
+import inspect
+import functools
+import collections
+import numpy as np
+
+opmode_names = {
+	vrep.simx_opmode_oneshot        : 'oneshot',
+	vrep.simx_opmode_blocking       : 'blocking',
+	vrep.simx_opmode_oneshot_split  : 'oneshot_split',
+	vrep.simx_opmode_streaming      : 'streaming',
+	vrep.simx_opmode_streaming_split: 'streaming_split',
+	vrep.simx_opmode_discontinue    : 'discontinue',
+	vrep.simx_opmode_buffer         : 'buffer',
+	vrep.simx_opmode_remove         : 'remove',
+}
+
+return_code_names = [
+	'simx_return_novalue_flag',
+	'simx_return_timeout_flag',
+	'simx_return_illegal_opmode_flag',
+	'simx_return_remote_error_flag',
+	'simx_return_split_progress_flag',
+	'simx_return_local_error_flag',
+	'simx_return_initialize_error_flag']
+
+# Helpers that do not talk to the server
+_local_functions = {'simxCreateBuffer', 'simxReleaseBuffer', 'simxPackInts', 'simxUnpackInts',
+	'simxPackFloats', 'simxUnpackFloats', 'simxPackIntsArray', 'simxUnpackIntsArray',
+	'simxPackFloatsArray', 'simxUnpackFloatsArray'}
+
+# Functions whose result is not a simx_return_* code
+_no_return_code = {'simxStart', 'simxFinish', 'simxGetConnectionId', 'simxGetLastCmdTime',
+	'simxGetInMessageInfo', 'simxGetOutMessageInfo'}
+
+# Functions that do not send anything to the server
+_no_command = _no_return_code | {'simxPauseCommunication'}
+
+def payload_size(value):
+	"""Approximate size in bytes of remote API arguments or results.
+	"""
+	if value is None:
+		return 0
+	if isinstance(value, np.ndarray):
+		return value.nbytes
+	if isinstance(value, (bytes, bytearray, str)):
+		return len(value)
+	if isinstance(value, (tuple, list)):
+		return sum(payload_size(v) for v in value)
+	return 4
+
+def opmode_name(opmode):
+	if opmode is None:
+		return 'none'
+	return opmode_names.get(opmode & 0xff0000, str(opmode))
+
+def return_code_name(code):
+	"""'simx_return_ok' or the names of the flags set in code, joined by '|'.
+	"""
+	if code == vrep.simx_return_ok:
+		return 'simx_return_ok'
+	return '|'.join(name for i, name in enumerate(return_code_names) if code & (1 << i))
+
+class RpcStats(object):
+	"""Stand-in for the vrep module (see VrepEnv.enable_rpc_stats) that times every
+	simx* call and counts its return codes, per function and operation mode.
+	Calls are also recorded on trace (a trace.TraceTrack) and traffic (a
+	TrafficStats) if set.
+	"""
+	def __init__(self):
+		self.trace = None
+		self.traffic = None
+		self.reset()
+
+	def reset(self):
+		# (function name, opmode) -> [count, total, min, max, return code counts]
+		self.calls = {}
+
+	def __getattr__(self, name):
+		# Only reached once per name: wrappers are cached as attributes
+		value = getattr(vrep, name)
+		if not (name.startswith('simx') and callable(value)) or name in _local_functions:
+			return value
+		wrapper = self.wrap(name, value)
+		setattr(self, name, wrapper)
+		return wrapper
+
+	def wrap(self, name, func):
+		parameters = list(inspect.signature(func).parameters)
+		opmode_index = parameters.index('operationMode') if 'operationMode' in parameters else None
+		has_return_code = name not in _no_return_code
+		sends_command = name not in _no_command
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			t_start = time.perf_counter_ns()
+			result = func(*args, **kwargs)
+			duration = time.perf_counter_ns() - t_start
+			opmode = None
+			if 'operationMode' in kwargs:
+				opmode = kwargs['operationMode']
+			elif opmode_index is not None and opmode_index < len(args):
+				opmode = args[opmode_index]
+			code = None
+			if has_return_code:
+				code = result[0] if isinstance(result, tuple) else result
+			self.record(name, opmode, duration/1e9, code)
+			if self.trace is not None:
+				self.trace.complete(name, 'rpc', t_start, duration,
+					{'opmode': opmode_name(opmode), 'return_code': code})
+			if self.traffic is not None and sends_command:
+				if opmode_index is None:
+					sent = args[1:]
+				else:
+					sent = args[1:opmode_index] + args[opmode_index+1:]
+				self.traffic.record_command(opmode, sent, result, code)
+			return result
+		return wrapper
+
+	def record(self, name, opmode, duration, code):
+		key = (name, opmode)
+		stats = self.calls.get(key)
+		if stats is None:
+			stats = self.calls[key] = [0, 0.0, duration, duration, collections.Counter()]
+		stats[0] += 1
+		stats[1] += duration
+		stats[2] = min(stats[2], duration)
+		stats[3] = max(stats[3], duration)
+		if code is not None:
+			stats[4][code] += 1
+
+	def snapshot(self):
+		"""{function name: {opmode name: {'count', 'total', 'mean', 'min', 'max', 'return_codes'}}},
+		durations in seconds. Functions without operation mode are under 'none'.
+		"""
+		snapshot = {}
+		for (name, opmode), (count, total, t_min, t_max, codes) in self.calls.items():
+			snapshot.setdefault(name, {})[opmode_name(opmode)] = {
+				'count': count,
+				'total': total,
+				'mean' : total/count,
+				'min'  : t_min,
+				'max'  : t_max,
+				'return_codes': {return_code_name(code): n for code, n in codes.items()},
+			}
+		return snapshot
+
+class PhaseTimer(object):
+	"""Durations (ns) of the phases of env steps, e.g. actuate, trigger, observe,
+	reward, over the last window steps. A phase lasts from the previous mark
+	(start or lap) to its lap. Phases and steps are also recorded on trace
+	(a trace.TraceTrack) if set.
+	"""
+	def __init__(self, window=1000):
+		self.window = window
+		self.trace = None
+		self.reset()
+
+	def reset(self):
+		self.durations = {} # phase -> deque of durations
+		self.current = {}   # phase -> duration, for the step in progress
+		self.t_last = None
+		self.t_start = None
+
+	def start(self):
+		self.current = {}
+		self.t_start = self.t_last = time.perf_counter_ns()
+
+	def lap(self, name):
+		t = time.perf_counter_ns()
+		if self.t_last is not None:
+			self.current[name] = self.current.get(name, 0) + t - self.t_last
+			if self.trace is not None:
+				self.trace.complete(name, 'phase', self.t_last, t - self.t_last)
+		self.t_last = t
+
+	def end_step(self):
+		"""Adds the phases of the step in progress to the histograms and returns them.
+		"""
+		step = self.current
+		step['total'] = sum(step.values())
+		if self.trace is not None and self.t_start is not None:
+			self.trace.complete('step', 'step', self.t_start, time.perf_counter_ns() - self.t_start)
+		for name, duration in step.items():
+			if name not in self.durations:
+				self.durations[name] = collections.deque(maxlen=self.window)
+			self.durations[name].append(duration)
+		self.current = {}
+		self.t_last = self.t_start = None
+		return step
+
+	def histogram(self, name, bins=20):
+		"""(counts, bin edges in ns) of a phase, as numpy.histogram.
+		"""
+		return np.histogram(np.array(self.durations[name]), bins=bins)
+
+	def summary(self):
+		"""{phase: {'count', 'mean_ns', 'p50_ns', 'p90_ns', 'p99_ns', 'max_ns', 'share'}},
+		share being the fraction of the total step time spent in the phase.
+		"""
+		total = sum(self.durations['total']) if 'total' in self.durations else 0
+		summary = {}
+		for name, durations in self.durations.items():
+			durations = np.array(durations)
+			p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+			summary[name] = {
+				'count'  : len(durations),
+				'mean_ns': float(np.mean(durations)),
+				'p50_ns' : float(p50),
+				'p90_ns' : float(p90),
+				'p99_ns' : float(p99),
+				'max_ns' : int(np.max(durations)),
+				'share'  : float(np.sum(durations))/total if total else 0.0,
+			}
+		return summary
+
+class TrafficStats(object):
+	"""Messages and bytes exchanged with the server, per step and per episode,
+	and a window of ping times.
+	Message counts come from the ids of simxGetOutMessageInfo/simxGetInMessageInfo.
+	The message headers do not carry their size, so bytes are estimated from the
+	header sizes and the arguments/results of the commands (through RpcStats);
+	streamed replies are counted when read from the buffer.
+	"""
+	counter_names = ('messages_out', 'messages_in', 'bytes_out', 'bytes_in')
+
+	def __init__(self, ping_interval=100, window=100):
+		self.ping_interval = ping_interval # steps between ping samples (0: never)
+		self.pings = collections.deque(maxlen=window)
+		self.reset()
+
+	def reset(self):
+		self.total = dict.fromkeys(self.counter_names, 0)
+		self.step = dict.fromkeys(self.counter_names, 0)    # in progress
+		self.episode = dict.fromkeys(self.counter_names, 0) # in progress
+		self.last_step = None
+		self.last_episode = None
+		self.steps = 0
+		self.episode_steps = 0
+		self.episodes = 0
+		self.message_ids = None
+		self.pings.clear()
+
+	def add(self, name, value):
+		self.total[name] += value
+		self.step[name] += value
+		self.episode[name] += value
+
+	def record_command(self, opmode, sent, result, code):
+		reply = result[1:] if isinstance(result, tuple) else None
+		if opmode is not None and opmode & 0xff0000 in (vrep.simx_opmode_buffer, vrep.simx_opmode_remove):
+			# Local read of a reply that already arrived
+			if opmode & 0xff0000 == vrep.simx_opmode_buffer and code == vrep.simx_return_ok:
+				self.add('bytes_in', vrep.SIMX_SUBHEADER_SIZE + payload_size(reply))
+			return
+		self.add('bytes_out', vrep.SIMX_SUBHEADER_SIZE + payload_size(sent))
+		if opmode is None or opmode & 0xff0000 == vrep.simx_opmode_blocking:
+			self.add('bytes_in', vrep.SIMX_SUBHEADER_SIZE + payload_size(reply))
+
+	def update_messages(self, out_message_id, in_message_id):
+		"""Counts the messages since the previous update from their ids.
+		"""
+		if self.message_ids is not None:
+			messages_out = max(0, out_message_id - self.message_ids[0])
+			messages_in  = max(0, in_message_id  - self.message_ids[1])
+			self.add('messages_out', messages_out)
+			self.add('messages_in' , messages_in)
+			self.add('bytes_out', messages_out*vrep.SIMX_HEADER_SIZE)
+			self.add('bytes_in' , messages_in *vrep.SIMX_HEADER_SIZE)
+		self.message_ids = (out_message_id, in_message_id)
+
+	def ping_due(self):
+		"""Whether the step in progress should sample the ping time.
+		"""
+		return bool(self.ping_interval) and (self.steps + 1) % self.ping_interval == 0
+
+	def end_step(self):
+		self.last_step = self.step
+		self.step = dict.fromkeys(self.counter_names, 0)
+		self.steps += 1
+		self.episode_steps += 1
+
+	def discard_step(self):
+		"""Leaves the traffic since the last step out of the step counters
+		(still in the episode and total ones).
+		"""
+		self.step = dict.fromkeys(self.counter_names, 0)
+
+	def end_episode(self):
+		if self.episode_steps == 0:
+			# Reset twice in a row: still the same episode
+			return
+		self.episode_steps = 0
+		self.last_episode = self.episode
+		self.episode = dict.fromkeys(self.counter_names, 0)
+		self.episodes += 1
+
+	def snapshot(self):
+		pings = np.array(self.pings) if self.pings else None
+		return {
+			'steps': self.steps,
+			'episodes': self.episodes,
+			'total': dict(self.total),
+			'per_step': {name: value/max(1, self.steps) for name, value in self.total.items()},
+			'last_step': self.last_step,
+			'episode': dict(self.episode),
+			'last_episode': self.last_episode,
+			'ping_ms': None if pings is None else {
+				'last': float(pings[-1]),
+				'mean': float(np.mean(pings)),
+				'max' : float(np.max(pings)),
+				'samples': len(pings),
+			},
+		}
@@ -0,0 +1,183 @@
+"""Declarative observations and actions of envs, compiled into few remote API
+calls (see VrepEnv.set_observation_spec and VrepEnv.set_action_spec).
+"""
+
+from vrep_env.vrep_env import group_quantities
+
+import gym
+import numpy as np
+
+# Quantities that are fetched together when both are observed:
+#	quantity : (combined quantity, offset in its values)
+combined_quantities = {
+	'position'   : ('pose'    , 0),
+	'orientation': ('pose'    , 3),
+	'lin_vel'    : ('velocity', 0),
+	'ang_vel'    : ('velocity', 3),
+}
+
+class ObservationSpec(object):
+	"""Observation declared as (object, quantity[, indices]) entries, objects being
+	names or handles, quantities those of vrep_env.group_quantities and indices
+	the values kept (all by default), e.g.
+		ObservationSpec([('torso', 'position', [2]), ('thigh', 'lin_vel')])
+	The observation holds the kept values of the entries, in order.
+	"""
+	def __init__(self, entries):
+		self.entries = []
+		for entry in entries:
+			obj, quantity = entry[:2]
+			width = group_quantities[quantity][2]
+			indices = list(entry[2]) if len(entry) > 2 else list(range(width))
+			if any(i < 0 or i >= width for i in indices):
+				raise ValueError('Indices '+str(indices)+' out of the '+str(width)+' values of '+quantity+'.')
+			self.entries.append((obj, quantity, indices))
+		self.size = sum(len(indices) for _, _, indices in self.entries)
+
+	def space(self, low=-np.inf, high=np.inf):
+		return gym.spaces.Box(low, high, shape=(self.size,), dtype=np.float32)
+
+	def compile(self, env):
+		return ObservationPlan(env, self)
+
+class GroupFetch(object):
+	"""One simxGetObjectGroupData call and where its values go in the observation.
+	"""
+	def __init__(self, quantity):
+		self.quantity = quantity
+		self.object_type, self.data_type, self.width = group_quantities[quantity]
+		self.handles = [] # per observation value
+		self.offsets = [] # per observation value, in the values of its object
+		self.dest = []    # per observation value
+		self.all_handles = None
+		self.source = None
+
+	def locate(self, all_handles):
+		"""Indices in the returned values, for the objects returned in this order.
+		"""
+		index = {h: i for i, h in enumerate(all_handles)}
+		try:
+			rows = np.array([index[h] for h in self.handles], dtype=np.intp)
+		except KeyError as e:
+			raise RuntimeError('Object '+str(e)+' has no '+self.quantity+' data.')
+		self.source = rows*self.width + self.offsets
+		self.all_handles = list(all_handles)
+
+class ObservationPlan(object):
+	"""An ObservationSpec resolved for one env: one call per fetched quantity,
+	whatever the number of objects, streamed if the env streams.
+	"""
+	def __init__(self, env, spec):
+		self.env = env
+		requested = set(quantity for _, quantity, _ in spec.entries)
+		fetched = {}
+		for quantity in requested:
+			combined, offset = combined_quantities.get(quantity, (None, 0))
+			partners = [q for q in requested if q != quantity and combined_quantities.get(q, (None,))[0] == combined]
+			if combined is not None and (partners or combined in requested):
+				fetched[quantity] = (combined, offset)
+			else:
+				fetched[quantity] = (quantity, 0)
+		self.fetches = {}
+		dest = 0
+		for obj, quantity, indices in spec.entries:
+			handle = env.get_object_handle(obj) if isinstance(obj, str) else obj
+			name, offset = fetched[quantity]
+			if name not in self.fetches:
+				self.fetches[name] = GroupFetch(name)
+			fetch = self.fetches[name]
+			for i in indices:
+				fetch.handles.append(handle)
+				fetch.offsets.append(offset + i)
+				fetch.dest.append(dest)
+				dest += 1
+		for fetch in self.fetches.values():
+			fetch.offsets = np.array(fetch.offsets, dtype=np.intp)
+			fetch.dest = np.array(fetch.dest, dtype=np.intp)
+
+	def fetch(self, out):
+		env = self.env
+		for fetch in self.fetches.values():
+			all_handles, _, float_data, _ = env.RAPI_get(env.vrep.simxGetObjectGroupData,
+				fetch.object_type, fetch.data_type)
+			if all_handles != fetch.all_handles:
+				fetch.locate(all_handles)
+			out[fetch.dest] = np.asarray(float_data, dtype='float32')[fetch.source]
+		return out
+
+# Remote API setter of each control mode
+control_setters = {
+	'velocity': 'simxSetJointTargetVelocity',
+	'position': 'simxSetJointTargetPosition',
+	'force'   : 'simxSetJointForce',
+}
+
+class ActionSpec(object):
+	"""Actions driving joints (names or handles), one value per joint:
+		target = scale*clip(action, low, high)
+	control being 'velocity', 'position' (degrees, as set_joint_targets) or
+	'force'. scale, low and high are numbers or one value per joint.
+	With choices, a list of targets (one value per joint) per action, the
+	actions are discrete:
+		ActionSpec(['thigh_joint', 'leg_joint'], scale=3.75)
+		ActionSpec(['cart_joint'], choices=[[-2000.0], [2000.0]])
+	"""
+	def __init__(self, joints, control='velocity', scale=1.0, low=-1.0, high=1.0, choices=None):
+		if control not in control_setters:
+			raise ValueError('Unknown control '+str(control)+'.')
+		self.joints = list(joints)
+		self.control = control
+		n = len(self.joints)
+		self.scale = np.broadcast_to(np.asarray(scale, dtype='float64'), (n,)).copy()
+		self.low   = np.broadcast_to(np.asarray(low  , dtype='float32'), (n,)).copy()
+		self.high  = np.broadcast_to(np.asarray(high , dtype='float32'), (n,)).copy()
+		self.choices = None
+		if choices is not None:
+			try:
+				self.choices = np.array(choices, dtype='float64')
+			except ValueError:
+				# Lists of different lengths
+				self.choices = np.zeros(0)
+			if self.choices.ndim != 2 or self.choices.shape[1] != n:
+				raise ValueError('Choices '+str(choices)+' are not lists of '+str(n)+' targets, one per joint.')
+
+	def space(self):
+		if self.choices is not None:
+			return gym.spaces.Discrete(len(self.choices))
+		return gym.spaces.Box(self.low, self.high, dtype=np.float32)
+
+	def compile(self, env):
+		return ActionPlan(env, self)
+
+class ActionPlan(object):
+	"""An ActionSpec resolved for one env: targets computed with one vectorized
+	transform, sent as one message (VrepEnv.batched_commands).
+	"""
+	def __init__(self, env, spec):
+		self.env = env
+		self.handles = [env.get_object_handle(j) if isinstance(j, str) else j for j in spec.joints]
+		self.function = control_setters[spec.control]
+		# Targets in the units of the remote API
+		factor = -np.pi/180.0 if spec.control == 'position' else 1.0
+		self.scale = factor*spec.scale
+		self.low = spec.low.astype('float64')
+		self.high = spec.high.astype('float64')
+		self.choices = None if spec.choices is None else factor*spec.choices
+		self.targets = np.zeros(len(self.handles))
+
+	def transform(self, action):
+		"""Targets of an action (the same array every time).
+		"""
+		if self.choices is not None:
+			self.targets[:] = self.choices[int(action)]
+		else:
+			np.clip(action, self.low, self.high, out=self.targets)
+			self.targets *= self.scale
+		return self.targets
+
+	def send(self, action):
+		env = self.env
+		setter = getattr(env.vrep, self.function)
+		with env.batched_commands():
+			for handle, target in zip(self.handles, self.transform(action).tolist()):
+				env.RAPI_rc(setter(env.cID, handle, target, env.opM_set))
@@ -0,0 +1,82 @@
+"""Timelines of envs in the Chrome trace event format, to open in
+chrome://tracing or https://ui.perfetto.dev (see VrepEnv.enable_trace).
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+import contextlib
+import collections
+
+class TraceRecorder(object):
+	"""Keeps the last capacity events in memory and writes them to path on flush.
+	Each env records on its own track (one row of the timeline), so envs stepped
+	by threads of one process can share a recorder.
+	Timestamps come from time.perf_counter_ns, which is shared by the processes
+	of a machine, so the files of several processes line up.
+	"""
+	def __init__(self, path, capacity=100000):
+		self.path = path
+		self.pid = os.getpid()
+		self.events = collections.deque(maxlen=capacity)
+		self.recorded = 0
+		self.tracks = []
+		self.next_tid = itertools.count(1)
+		self.lock = threading.Lock()
+
+	def track(self, name):
+		tid = next(self.next_tid)
+		self.tracks.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+			'args': {'name': name}})
+		return TraceTrack(self, tid)
+
+	def add(self, event):
+		with self.lock:
+			self.events.append(event)
+			self.recorded += 1
+
+	def flush(self):
+		"""Writes the buffered events (the file is replaced, the buffer is kept).
+		"""
+		with self.lock:
+			trace = {
+				'traceEvents': self.tracks + list(self.events),
+				'displayTimeUnit': 'ms',
+				'otherData': {'dropped_events': self.recorded - len(self.events)},
+			}
+			# Envs sharing the recorder may flush at the same time
+			with open(self.path, 'w') as f:
+				json.dump(trace, f)
+
+class TraceTrack(object):
+	def __init__(self, recorder, tid):
+		self.recorder = recorder
+		self.tid = tid
+
+	def complete(self, name, category, t_start_ns, duration_ns, args=None):
+		"""An event from t_start_ns (time.perf_counter_ns) lasting duration_ns.
+		"""
+		event = {'name': name, 'cat': category, 'ph': 'X',
+			'ts': t_start_ns/1000.0, 'dur': duration_ns/1000.0,
+			'pid': self.recorder.pid, 'tid': self.tid}
+		if args:
+			event['args'] = args
+		self.recorder.add(event)
+
+	def instant(self, name, category, args=None):
+		event = {'name': name, 'cat': category, 'ph': 'i', 's': 't',
+			'ts': time.perf_counter_ns()/1000.0,
+			'pid': self.recorder.pid, 'tid': self.tid}
+		if args:
+			event['args'] = args
+		self.recorder.add(event)
+
+	@contextlib.contextmanager
+	def span(self, name, category, args=None):
+		t_start = time.perf_counter_ns()
+		try:
+			yield
+		finally:
+			self.complete(name, category, t_start, time.perf_counter_ns() - t_start, args)
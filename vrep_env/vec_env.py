@@ -0,0 +1,258 @@
+"""Vectorized environments: several VrepEnv instances, each one connected to its
+own V-REP server (port), stepped at the same time.
+"""
+
+import functools
+import traceback
+import multiprocessing
+import concurrent.futures
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+def make_env_fns(env_class, ports, **kwargs):
+	"""One env constructor per server port, e.g. for VrepVecEnv.
+	"""
+	return [functools.partial(env_class, server_port=port, **kwargs) for port in ports]
+
+def _worker(remote, parent_remote, env_fn):
+	parent_remote.close()
+	env = None
+	shm = None
+	observation = None
+	try:
+		env = env_fn()
+		remote.send((True, (env.observation_space, env.action_space)))
+		# Observations are written in this worker's slot of the shared block
+		shm_slot = remote.recv()
+		if shm_slot is None:
+			# Another worker failed to start
+			return
+		shm_name, offset = shm_slot
+		shm = shared_memory.SharedMemory(name=shm_name)
+		space = env.observation_space
+		observation = np.ndarray(space.shape, dtype=space.dtype, buffer=shm.buf, offset=offset)
+		while True:
+			cmd, data = remote.recv()
+			if cmd == 'step':
+				obs, reward, done, info = env.step(data)
+				if done:
+					info['terminal_observation'] = np.array(obs)
+					obs = env.reset()
+				observation[...] = obs
+				remote.send((True, (reward, done, info)))
+			elif cmd == 'reset':
+				observation[...] = env.reset()
+				remote.send((True, None))
+			elif cmd == 'close':
+				break
+	except Exception:
+		remote.send((False, traceback.format_exc()))
+	finally:
+		observation = None
+		if shm is not None:
+			shm.close()
+		if env is not None:
+			env.close()
+		remote.close()
+
+class VrepVecEnv(object):
+	"""Runs one env per worker process (each with its own V-REP server port).
+	Observations come back through shared memory; actions, rewards, dones and
+	infos through pipes. Envs are reset automatically when done, the final
+	observation being kept in info['terminal_observation'].
+	"""
+	def __init__(self, env_fns, start_method=None):
+		self.num_envs = len(env_fns)
+		self.waiting = False
+		self.closed = False
+		# Seconds given to workers to exit (or to reply, when closing while
+		# waiting) before they are terminated
+		self.close_timeout = 10.0
+		
+		ctx = multiprocessing.get_context(start_method)
+		# Workers share the tracker of this process, which unlinks the shared
+		# block once; otherwise each of them would start its own (bpo-39959)
+		resource_tracker.ensure_running()
+		pipes = [ctx.Pipe() for _ in env_fns]
+		self.remotes = [parent for parent, _ in pipes]
+		self.processes = []
+		self.shm = None
+		self.observations = None
+		try:
+			for (parent, child), env_fn in zip(pipes, env_fns):
+				process = ctx.Process(target=_worker, args=(child, parent, env_fn), daemon=True)
+				process.start()
+				child.close()
+				self.processes.append(process)
+			
+			spaces = self._recv_all()
+			self.observation_space, self.action_space = spaces[0]
+			
+			space = self.observation_space
+			obs_nbytes = int(np.prod(space.shape))*np.dtype(space.dtype).itemsize
+			self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.num_envs*obs_nbytes))
+			self.observations = np.ndarray((self.num_envs,)+space.shape, dtype=space.dtype, buffer=self.shm.buf)
+			for i, remote in enumerate(self.remotes):
+				remote.send((self.shm.name, i*obs_nbytes))
+		except BaseException:
+			self._stop_workers(None)
+			self._release_shm()
+			self.closed = True
+			raise
+	
+	def _recv(self, remote):
+		try:
+			ok, payload = remote.recv()
+		except EOFError:
+			raise RuntimeError('VrepVecEnv worker exited.')
+		if not ok:
+			raise RuntimeError('VrepVecEnv worker failed:\n'+payload)
+		return payload
+	
+	def _recv_all(self):
+		"""Replies of all workers. A failure is raised once every reply is in, so
+		that none is left in the pipes.
+		"""
+		results = []
+		failure = None
+		for remote in self.remotes:
+			try:
+				results.append(self._recv(remote))
+			except RuntimeError as e:
+				results.append(None)
+				failure = failure or e
+		if failure is not None:
+			raise failure
+		return results
+	
+	def _stop_workers(self, message):
+		"""Sends message to the live workers, then terminates those still running
+		after close_timeout.
+		"""
+		for remote, process in zip(self.remotes, self.processes):
+			if process.is_alive():
+				try:
+					remote.send(message)
+				except OSError:
+					# Exited meanwhile
+					pass
+		for process in self.processes:
+			process.join(self.close_timeout)
+			if process.is_alive():
+				process.terminate()
+				process.join()
+	
+	def _release_shm(self):
+		self.observations = None
+		if self.shm is not None:
+			self.shm.close()
+			self.shm.unlink()
+			self.shm = None
+	
+	def reset(self):
+		for remote in self.remotes:
+			remote.send(('reset', None))
+		self._recv_all()
+		return self.observations.copy()
+	
+	def step_async(self, actions):
+		for remote, action in zip(self.remotes, actions):
+			remote.send(('step', action))
+		self.waiting = True
+	
+	def step_wait(self):
+		try:
+			results = self._recv_all()
+		finally:
+			self.waiting = False
+		rewards, dones, infos = zip(*results)
+		return self.observations.copy(), np.array(rewards), np.array(dones), list(infos)
+	
+	def step(self, actions):
+		self.step_async(actions)
+		return self.step_wait()
+	
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		try:
+			if self.waiting:
+				# Replies of the pending step, from the workers that answer in time
+				for remote, process in zip(self.remotes, self.processes):
+					try:
+						if process.is_alive() and remote.poll(self.close_timeout):
+							remote.recv()
+					except (EOFError, OSError):
+						pass
+				self.waiting = False
+			self._stop_workers(('close', None))
+		finally:
+			self._release_shm()
+
+class ThreadedVrepVecEnv(object):
+	"""Runs all envs in this process, stepping them on a thread pool.
+	ctypes releases the GIL inside the remote API calls, so the envs wait for
+	their servers at the same time. Same interface and auto-reset as VrepVecEnv,
+	without inter-process communication.
+	"""
+	def __init__(self, env_fns, max_workers=None):
+		self.num_envs = len(env_fns)
+		self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or self.num_envs)
+		self.envs = list(self.pool.map(lambda env_fn: env_fn(), env_fns))
+		self.observation_space = self.envs[0].observation_space
+		self.action_space      = self.envs[0].action_space
+		
+		space = self.observation_space
+		self.observations = np.zeros((self.num_envs,)+space.shape, dtype=space.dtype)
+		self.rewards = np.zeros(self.num_envs, dtype='float64')
+		self.dones   = np.zeros(self.num_envs, dtype='bool')
+		self.infos   = [{} for _ in self.envs]
+		self.futures = None
+		self.closed = False
+	
+	def _reset(self, i):
+		self.observations[i] = self.envs[i].reset()
+	
+	def _step(self, i, action):
+		obs, self.rewards[i], self.dones[i], info = self.envs[i].step(action)
+		if self.dones[i]:
+			info['terminal_observation'] = np.array(obs)
+			obs = self.envs[i].reset()
+		self.observations[i] = obs
+		self.infos[i] = info
+	
+	def reset(self):
+		for future in [self.pool.submit(self._reset, i) for i in range(self.num_envs)]:
+			future.result()
+		return self.observations.copy()
+	
+	def step_async(self, actions):
+		self.futures = [self.pool.submit(self._step, i, action) for i, action in enumerate(actions)]
+	
+	def step_wait(self):
+		futures, self.futures = self.futures, None
+		# Every env is done stepping before a failure is raised
+		concurrent.futures.wait(futures)
+		for future in futures:
+			future.result()
+		return self.observations.copy(), self.rewards.copy(), self.dones.copy(), list(self.infos)
+	
+	def step(self, actions):
+		self.step_async(actions)
+		return self.step_wait()
+	
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		try:
+			if self.futures is not None:
+				# Envs are not closed while they step
+				concurrent.futures.wait(self.futures)
+				self.futures = None
+			for future in [self.pool.submit(env.close) for env in self.envs]:
+				future.result()
+		finally:
+			self.pool.shutdown()
@@ -30,7 +30,9 @@ import platform
 import struct
 import sys
 import os
+import threading
 import ctypes as ct
+import numpy as np
 
 # from vrepConst import *
 
@@ -840,121 +842,170 @@ except:
     print ('----------------------------------------------------')
     print ('')
 
-#ctypes wrapper prototypes 
-c_GetJointPosition          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointPosition", libsimx))
-c_SetJointPosition          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointPosition", libsimx))
-c_GetJointMatrix            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointMatrix", libsimx))
-c_SetSphericalJointMatrix   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetSphericalJointMatrix", libsimx))
-c_SetJointTargetVelocity    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointTargetVelocity", libsimx))
-c_SetJointTargetPosition    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointTargetPosition", libsimx))
-c_GetJointForce             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointForce", libsimx))
-c_SetJointForce             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointForce", libsimx))
-c_ReadForceSensor           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)(("simxReadForceSensor", libsimx))
-c_BreakForceSensor          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxBreakForceSensor", libsimx))
-c_ReadVisionSensor          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxReadVisionSensor", libsimx))
-c_GetObjectHandle           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectHandle", libsimx))
-c_GetVisionSensorImage      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_byte)), ct.c_ubyte, ct.c_int32)(("simxGetVisionSensorImage", libsimx))
-c_SetVisionSensorImage      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_byte), ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetVisionSensorImage", libsimx))
-c_GetVisionSensorDepthBuffer= ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.c_int32)(("simxGetVisionSensorDepthBuffer", libsimx))
-c_GetObjectChild            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectChild", libsimx))
-c_GetObjectParent           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectParent", libsimx))
-c_ReadProximitySensor       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.c_int32)(("simxReadProximitySensor", libsimx))
-c_LoadModel                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.c_int32)(("simxLoadModel", libsimx))
-c_LoadUI                    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxLoadUI", libsimx))
-c_LoadScene                 =  ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.c_int32)(("simxLoadScene", libsimx))
-c_StartSimulation           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxStartSimulation", libsimx))
-c_PauseSimulation           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxPauseSimulation", libsimx))
-c_StopSimulation            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxStopSimulation", libsimx))
-c_GetUIHandle               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIHandle", libsimx))
-c_GetUISlider               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUISlider", libsimx))
-c_SetUISlider               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetUISlider", libsimx))
-c_GetUIEventButton          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIEventButton", libsimx))
-c_GetUIButtonProperty       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIButtonProperty", libsimx))
-c_SetUIButtonProperty       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetUIButtonProperty", libsimx))
-c_AddStatusbarMessage       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxAddStatusbarMessage", libsimx))
-c_AuxiliaryConsoleOpen      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.c_int32)(("simxAuxiliaryConsoleOpen", libsimx))
-c_AuxiliaryConsoleClose     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxAuxiliaryConsoleClose", libsimx))
-c_AuxiliaryConsolePrint     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxAuxiliaryConsolePrint", libsimx))
-c_AuxiliaryConsoleShow      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxAuxiliaryConsoleShow", libsimx))
-c_GetObjectOrientation      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectOrientation", libsimx))
-c_GetObjectPosition         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectPosition", libsimx))
-c_SetObjectOrientation      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetObjectOrientation", libsimx))
-c_SetObjectPosition         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetObjectPosition", libsimx))
-c_SetObjectParent           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetObjectParent", libsimx))
-c_SetUIButtonLabel          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32)(("simxSetUIButtonLabel", libsimx))
-c_GetLastErrors             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetLastErrors", libsimx))
-c_GetArrayParameter         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetArrayParameter", libsimx))
-c_SetArrayParameter         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetArrayParameter", libsimx))
-c_GetBooleanParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxGetBooleanParameter", libsimx))
-c_SetBooleanParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetBooleanParameter", libsimx))
-c_GetIntegerParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetIntegerParameter", libsimx))
-c_SetIntegerParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetIntegerParameter", libsimx))
-c_GetFloatingParameter      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetFloatingParameter", libsimx))
-c_SetFloatingParameter      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetFloatingParameter", libsimx))
-c_GetStringParameter        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetStringParameter", libsimx))
-c_GetCollisionHandle        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetCollisionHandle", libsimx))
-c_GetDistanceHandle         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetDistanceHandle", libsimx))
-c_GetCollectionHandle       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetCollectionHandle", libsimx))
-c_ReadCollision             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxReadCollision", libsimx))
-c_ReadDistance              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxReadDistance", libsimx))
-c_RemoveObject              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveObject", libsimx))
-c_RemoveModel               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveModel", libsimx))
-c_RemoveUI                  = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveUI", libsimx))
-c_CloseScene                = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxCloseScene", libsimx))
-c_GetObjects                = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxGetObjects", libsimx))
-c_DisplayDialog             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)(("simxDisplayDialog", libsimx))
-c_EndDialog                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxEndDialog", libsimx))
-c_GetDialogInput            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetDialogInput", libsimx))
-c_GetDialogResult           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetDialogResult", libsimx))
-c_CopyPasteObjects          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxCopyPasteObjects", libsimx))
-c_GetObjectSelection        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectSelection", libsimx))
-c_SetObjectSelection        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.c_int32)(("simxSetObjectSelection", libsimx))
-c_ClearFloatSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearFloatSignal", libsimx))
-c_ClearIntegerSignal        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearIntegerSignal", libsimx))
-c_ClearStringSignal         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearStringSignal", libsimx))
-c_GetFloatSignal            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.c_int32)(("simxGetFloatSignal", libsimx))
-c_GetIntegerSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetIntegerSignal", libsimx))
-c_GetStringSignal           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetStringSignal", libsimx))
-c_SetFloatSignal            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_float, ct.c_int32)(("simxSetFloatSignal", libsimx))
-c_SetIntegerSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)(("simxSetIntegerSignal", libsimx))
-c_SetStringSignal           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxSetStringSignal", libsimx))
-c_AppendStringSignal        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxAppendStringSignal", libsimx))
-c_WriteStringStream         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxWriteStringStream", libsimx))
-c_GetObjectFloatParameter   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectFloatParameter", libsimx))
-c_SetObjectFloatParameter   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetObjectFloatParameter", libsimx))
-c_GetObjectIntParameter     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectIntParameter", libsimx))
-c_SetObjectIntParameter     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetObjectIntParameter", libsimx))
-c_GetModelProperty          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetModelProperty", libsimx))
-c_SetModelProperty          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetModelProperty", libsimx))
-c_Start                     = ct.CFUNCTYPE(ct.c_int32,ct.POINTER(ct.c_char), ct.c_int32, ct.c_ubyte, ct.c_ubyte, ct.c_int32, ct.c_int32)(("simxStart", libsimx))
-c_Finish                    = ct.CFUNCTYPE(None, ct.c_int32)(("simxFinish", libsimx))
-c_GetPingTime               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetPingTime", libsimx))
-c_GetLastCmdTime            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxGetLastCmdTime", libsimx))
-c_SynchronousTrigger        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxSynchronousTrigger", libsimx))
-c_Synchronous               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_ubyte)(("simxSynchronous", libsimx))
-c_PauseCommunication        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_ubyte)(("simxPauseCommunication", libsimx))
-c_GetInMessageInfo          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetInMessageInfo", libsimx))
-c_GetOutMessageInfo         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetOutMessageInfo", libsimx))
-c_GetConnectionId           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxGetConnectionId", libsimx))
-c_CreateBuffer              = ct.CFUNCTYPE(ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxCreateBuffer", libsimx))
-c_ReleaseBuffer             = ct.CFUNCTYPE(None, ct.c_void_p)(("simxReleaseBuffer", libsimx))
-c_TransferFile              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)(("simxTransferFile", libsimx))
-c_EraseFile                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxEraseFile", libsimx))
-c_GetAndClearStringSignal   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetAndClearStringSignal", libsimx))
-c_ReadStringStream          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxReadStringStream", libsimx))
-c_CreateDummy               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_float, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_int32), ct.c_int32)(("simxCreateDummy", libsimx))
-c_Query                     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxQuery", libsimx))
-c_GetObjectGroupData        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetObjectGroupData", libsimx))
-c_GetObjectVelocity         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectVelocity", libsimx))
-c_CallScriptFunction        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_int32),ct.c_int32,ct.POINTER(ct.c_float),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_ubyte),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_ubyte)),ct.c_int32)(("simxCallScriptFunction", libsimx))
+#ctypes wrapper prototypes, by library function name
+prototypes = {}
+libraryFunctions = {}
+
+def _bind(name, restype, *argtypes):
+    prototype = ct.CFUNCTYPE(restype, *argtypes)
+    prototypes[name] = prototype
+    if libsimx is None:
+        def unavailable(*args):
+            raise RuntimeError('The remoteApi library is not loaded (' + name + ').')
+        libraryFunctions[name] = unavailable
+    else:
+        libraryFunctions[name] = prototype((name, libsimx))
+    return libraryFunctions[name]
+
+_backendCallbacks = []
+
+def bindBackend(backend):
+    '''
+    Routes the c_* calls to the simx* methods of backend (e.g. vrep_env.fake_simx.FakeRemoteApi)
+    instead of the remoteApi library. The methods are wrapped in the same ctypes prototypes,
+    so arguments are marshaled exactly as for the library. bindBackend(None) restores the library.
+    '''
+    del _backendCallbacks[:]
+    for name, prototype in prototypes.items():
+        func = libraryFunctions[name]
+        method = getattr(backend, name, None)
+        if method is not None:
+            func = prototype(method)
+            _backendCallbacks.append(func) # must outlive the calls
+        globals()['c_' + name[4:]] = func
+
+c_GetJointPosition          = _bind("simxGetJointPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointPosition          = _bind("simxSetJointPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetJointMatrix            = _bind("simxGetJointMatrix", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetSphericalJointMatrix   = _bind("simxSetSphericalJointMatrix", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointTargetVelocity    = _bind("simxSetJointTargetVelocity", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_SetJointTargetPosition    = _bind("simxSetJointTargetPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetJointForce             = _bind("simxGetJointForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointForce             = _bind("simxSetJointForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_ReadForceSensor           = _bind("simxReadForceSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)
+c_BreakForceSensor          = _bind("simxBreakForceSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_ReadVisionSensor          = _bind("simxReadVisionSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_GetObjectHandle           = _bind("simxGetObjectHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetVisionSensorImage      = _bind("simxGetVisionSensorImage", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_byte)), ct.c_ubyte, ct.c_int32)
+c_SetVisionSensorImage      = _bind("simxSetVisionSensorImage", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_byte), ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetVisionSensorDepthBuffer= _bind("simxGetVisionSensorDepthBuffer", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.c_int32)
+c_GetObjectChild            = _bind("simxGetObjectChild", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectParent           = _bind("simxGetObjectParent", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadProximitySensor       = _bind("simxReadProximitySensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.c_int32)
+c_LoadModel                 = _bind("simxLoadModel", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.c_int32)
+c_LoadUI                    = _bind("simxLoadUI", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_LoadScene                 = _bind("simxLoadScene", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.c_int32)
+c_StartSimulation           = _bind("simxStartSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_PauseSimulation           = _bind("simxPauseSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_StopSimulation            = _bind("simxStopSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_GetUIHandle               = _bind("simxGetUIHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetUISlider               = _bind("simxGetUISlider", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetUISlider               = _bind("simxSetUISlider", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetUIEventButton          = _bind("simxGetUIEventButton", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetUIButtonProperty       = _bind("simxGetUIButtonProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetUIButtonProperty       = _bind("simxSetUIButtonProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_AddStatusbarMessage       = _bind("simxAddStatusbarMessage", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_AuxiliaryConsoleOpen      = _bind("simxAuxiliaryConsoleOpen", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.c_int32)
+c_AuxiliaryConsoleClose     = _bind("simxAuxiliaryConsoleClose", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_AuxiliaryConsolePrint     = _bind("simxAuxiliaryConsolePrint", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_AuxiliaryConsoleShow      = _bind("simxAuxiliaryConsoleShow", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetObjectOrientation      = _bind("simxGetObjectOrientation", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetObjectPosition         = _bind("simxGetObjectPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectOrientation      = _bind("simxSetObjectOrientation", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectPosition         = _bind("simxSetObjectPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectParent           = _bind("simxSetObjectParent", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_SetUIButtonLabel          = _bind("simxSetUIButtonLabel", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32)
+c_GetLastErrors             = _bind("simxGetLastErrors", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetArrayParameter         = _bind("simxGetArrayParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetArrayParameter         = _bind("simxSetArrayParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetBooleanParameter       = _bind("simxGetBooleanParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_SetBooleanParameter       = _bind("simxSetBooleanParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetIntegerParameter       = _bind("simxGetIntegerParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetIntegerParameter       = _bind("simxSetIntegerParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetFloatingParameter      = _bind("simxGetFloatingParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetFloatingParameter      = _bind("simxSetFloatingParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetStringParameter        = _bind("simxGetStringParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetCollisionHandle        = _bind("simxGetCollisionHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetDistanceHandle         = _bind("simxGetDistanceHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetCollectionHandle       = _bind("simxGetCollectionHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadCollision             = _bind("simxReadCollision", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_ReadDistance              = _bind("simxReadDistance", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_RemoveObject              = _bind("simxRemoveObject", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_RemoveModel               = _bind("simxRemoveModel", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_RemoveUI                  = _bind("simxRemoveUI", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_CloseScene                = _bind("simxCloseScene", ct.c_int32,ct.c_int32, ct.c_int32)
+c_GetObjects                = _bind("simxGetObjects", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_DisplayDialog             = _bind("simxDisplayDialog", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)
+c_EndDialog                 = _bind("simxEndDialog", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetDialogInput            = _bind("simxGetDialogInput", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetDialogResult           = _bind("simxGetDialogResult", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_CopyPasteObjects          = _bind("simxCopyPasteObjects", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectSelection        = _bind("simxGetObjectSelection", ct.c_int32,ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetObjectSelection        = _bind("simxSetObjectSelection", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.c_int32)
+c_ClearFloatSignal          = _bind("simxClearFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_ClearIntegerSignal        = _bind("simxClearIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_ClearStringSignal         = _bind("simxClearStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_GetFloatSignal            = _bind("simxGetFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.c_int32)
+c_GetIntegerSignal          = _bind("simxGetIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetStringSignal           = _bind("simxGetStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetFloatSignal            = _bind("simxSetFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_float, ct.c_int32)
+c_SetIntegerSignal          = _bind("simxSetIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)
+c_SetStringSignal           = _bind("simxSetStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_AppendStringSignal        = _bind("simxAppendStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_WriteStringStream         = _bind("simxWriteStringStream", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_GetObjectFloatParameter   = _bind("simxGetObjectFloatParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectFloatParameter   = _bind("simxSetObjectFloatParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetObjectIntParameter     = _bind("simxGetObjectIntParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetObjectIntParameter     = _bind("simxSetObjectIntParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetModelProperty          = _bind("simxGetModelProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetModelProperty          = _bind("simxSetModelProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_Start                     = _bind("simxStart", ct.c_int32,ct.POINTER(ct.c_char), ct.c_int32, ct.c_ubyte, ct.c_ubyte, ct.c_int32, ct.c_int32)
+c_Finish                    = _bind("simxFinish", None, ct.c_int32)
+c_GetPingTime               = _bind("simxGetPingTime", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetLastCmdTime            = _bind("simxGetLastCmdTime", ct.c_int32,ct.c_int32)
+c_SynchronousTrigger        = _bind("simxSynchronousTrigger", ct.c_int32,ct.c_int32)
+c_Synchronous               = _bind("simxSynchronous", ct.c_int32,ct.c_int32, ct.c_ubyte)
+c_PauseCommunication        = _bind("simxPauseCommunication", ct.c_int32,ct.c_int32, ct.c_ubyte)
+c_GetInMessageInfo          = _bind("simxGetInMessageInfo", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetOutMessageInfo         = _bind("simxGetOutMessageInfo", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetConnectionId           = _bind("simxGetConnectionId", ct.c_int32,ct.c_int32)
+c_CreateBuffer              = _bind("simxCreateBuffer", ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_ReleaseBuffer             = _bind("simxReleaseBuffer", None, ct.c_void_p)
+c_TransferFile              = _bind("simxTransferFile", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)
+c_EraseFile                 = _bind("simxEraseFile", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_GetAndClearStringSignal   = _bind("simxGetAndClearStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadStringStream          = _bind("simxReadStringStream", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_CreateDummy               = _bind("simxCreateDummy", ct.c_int32,ct.c_int32, ct.c_float, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_int32), ct.c_int32)
+c_Query                     = _bind("simxQuery", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectGroupData        = _bind("simxGetObjectGroupData", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetObjectVelocity         = _bind("simxGetObjectVelocity", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)
+c_CallScriptFunction        = _bind("simxCallScriptFunction", ct.c_int32,ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_int32),ct.c_int32,ct.POINTER(ct.c_float),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_ubyte),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_ubyte)),ct.c_int32)
+
+#Output buffers reused by the getters, one set per thread
+_outBuffers = threading.local()
+
+def _floatBuffer(name, size):
+    buf = getattr(_outBuffers, name, None)
+    if buf is None:
+        buf = (ct.c_float*size)()
+        setattr(_outBuffers, name, buf)
+    return buf
+
+def _clearOnError(ret, *buffers):
+    #A failed call leaves the values of a previous call (maybe of another object) in the reused buffers
+    if ret != simx_return_ok:
+        for buf in buffers:
+            ct.memset(buf, 0, ct.sizeof(buf))
+    return ret
 
 #API functions
 def simxGetJointPosition(clientID, jointHandle, operationMode):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
     '''
-    position = ct.c_float()
-    return c_GetJointPosition(clientID, jointHandle, ct.byref(position), operationMode), position.value
+    position = _floatBuffer('jointPosition', 1)
+    ret = _clearOnError(c_GetJointPosition(clientID, jointHandle, position, operationMode), position)
+    return ret, position[0]
 
 def simxSetJointPosition(clientID, jointHandle, position, operationMode):
     '''
@@ -963,16 +1014,17 @@ def simxSetJointPosition(clientID, jointHandle, position, operationMode):
 
     return c_SetJointPosition(clientID, jointHandle, position, operationMode)
 
-def simxGetJointMatrix(clientID, jointHandle, operationMode):
+def simxGetJointMatrix(clientID, jointHandle, operationMode, out=None):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
+    The result is written into out (12 elements) instead of a new list if given.
     '''
-    matrix = (ct.c_float*12)()
-    ret = c_GetJointMatrix(clientID, jointHandle, matrix, operationMode)
-    arr = []
-    for i in range(12):
-        arr.append(matrix[i])
-    return ret, arr
+    matrix = _floatBuffer('jointMatrix', 12)
+    ret = _clearOnError(c_GetJointMatrix(clientID, jointHandle, matrix, operationMode), matrix)
+    if out is not None:
+        out[:] = matrix
+        return ret, out
+    return ret, matrix[:]
 
 def simxSetSphericalJointMatrix(clientID, jointHandle, matrix, operationMode):
     '''
@@ -1006,8 +1058,9 @@ def simxGetJointForce(clientID, jointHandle, operationMode):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
     '''
-    force = ct.c_float()
-    return c_GetJointForce(clientID, jointHandle, ct.byref(force), operationMode), force.value
+    force = _floatBuffer('jointForce', 1)
+    ret = _clearOnError(c_GetJointForce(clientID, jointHandle, force, operationMode), force)
+    return ret, force[0]
 
 def simxSetJointForce(clientID, jointHandle, force, operationMode):
     '''
@@ -1095,6 +1148,29 @@ def simxGetVisionSensorImage(clientID, sensorHandle, options, operationMode):
             reso.append(resolution[i])
     return ret, reso, image
 
+def simxGetVisionSensorImageArray(clientID, sensorHandle, options, operationMode, out=None):
+    '''
+    Same as simxGetVisionSensorImage, but returns a uint8 array of shape (resY, resX, 3), or
+    (resY, resX) when bit 0 of options is set (greyscale), with the rows in top-down order.
+    The C buffer is copied once, into out if given (it must have the right shape).
+    '''
+
+    resolution = (ct.c_int*2)()
+    c_image  = ct.POINTER(ct.c_byte)()
+    ret = c_GetVisionSensorImage(clientID, sensorHandle, resolution, ct.byref(c_image), options, operationMode)
+
+    reso = []
+    # No buffer comes with the reply of simx_opmode_discontinue/remove
+    if (ret == 0) and c_image:
+        reso = [resolution[0], resolution[1]]
+        shape = (reso[1], reso[0]) if (options & 1) != 0 else (reso[1], reso[0], 3)
+        image = np.ctypeslib.as_array(ct.cast(c_image, ct.POINTER(ct.c_ubyte)), shape=shape)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        # V-REP stores the bottom row first
+        np.copyto(out, image[::-1])
+    return ret, reso, out
+
 def simxSetVisionSensorImage(clientID, sensorHandle, image, options, operationMode):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
@@ -1120,6 +1196,26 @@ def simxGetVisionSensorDepthBuffer(clientID, sensorHandle, operationMode):
             reso.append(resolution[i])
     return ret, reso, buffer
 
+def simxGetVisionSensorDepthBufferArray(clientID, sensorHandle, operationMode, out=None):
+    '''
+    Same as simxGetVisionSensorDepthBuffer, but returns a float32 array of shape (resY, resX)
+    with the rows in top-down order.
+    The C buffer is copied once, into out if given (it must have the right shape).
+    '''
+    c_buffer  = ct.POINTER(ct.c_float)()
+    resolution = (ct.c_int*2)()
+    ret = c_GetVisionSensorDepthBuffer(clientID, sensorHandle, resolution, ct.byref(c_buffer), operationMode)
+    reso = []
+    if (ret == 0) and c_buffer:
+        reso = [resolution[0], resolution[1]]
+        shape = (reso[1], reso[0])
+        depth = np.ctypeslib.as_array(c_buffer, shape=shape)
+        if out is None:
+            out = np.empty(shape, dtype=np.float32)
+        # V-REP stores the bottom row first
+        np.copyto(out, depth[::-1])
+    return ret, reso, out
+
 def simxGetObjectChild(clientID, parentObjectHandle, childIndex, operationMode):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
@@ -1323,27 +1419,29 @@ def simxAuxiliaryConsoleShow(clientID, consoleHandle, showState, operationMode):
 
     return c_AuxiliaryConsoleShow(clientID, consoleHandle, showState, operationMode)
 
-def simxGetObjectOrientation(clientID, objectHandle, relativeToObjectHandle, operationMode):
+def simxGetObjectOrientation(clientID, objectHandle, relativeToObjectHandle, operationMode, out=None):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
+    The result is written into out (3 elements) instead of a new list if given.
     '''
-    eulerAngles = (ct.c_float*3)()
-    ret = c_GetObjectOrientation(clientID, objectHandle, relativeToObjectHandle, eulerAngles, operationMode)
-    arr = []
-    for i in range(3):
-        arr.append(eulerAngles[i])
-    return ret, arr
+    eulerAngles = _floatBuffer('eulerAngles', 3)
+    ret = _clearOnError(c_GetObjectOrientation(clientID, objectHandle, relativeToObjectHandle, eulerAngles, operationMode), eulerAngles)
+    if out is not None:
+        out[:] = eulerAngles
+        return ret, out
+    return ret, eulerAngles[:]
 
-def simxGetObjectPosition(clientID, objectHandle, relativeToObjectHandle, operationMode):
+def simxGetObjectPosition(clientID, objectHandle, relativeToObjectHandle, operationMode, out=None):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
+    The result is written into out (3 elements) instead of a new list if given.
     '''
-    position = (ct.c_float*3)()
-    ret = c_GetObjectPosition(clientID, objectHandle, relativeToObjectHandle, position, operationMode)
-    arr = []
-    for i in range(3):
-        arr.append(position[i])
-    return ret, arr
+    position = _floatBuffer('position', 3)
+    ret = _clearOnError(c_GetObjectPosition(clientID, objectHandle, relativeToObjectHandle, position, operationMode), position)
+    if out is not None:
+        out[:] = position
+        return ret, out
+    return ret, position[:]
 
 def simxSetObjectOrientation(clientID, objectHandle, relativeToObjectHandle, eulerAngles, operationMode):
     '''
@@ -1747,8 +1845,7 @@ def simxGetStringSignal(clientID, signalName, operationMode):
 
     a = bytearray()
     if ret == 0:
-        for i in range(signalLength.value):
-            a.append(signalValue[i])
+        a = bytearray(ct.string_at(signalValue, signalLength.value))
     if sys.version_info[0] != 3:
         a=str(a)
 
@@ -2135,7 +2232,7 @@ def simxCallScriptFunction(clientID, scriptDescription, options, functionName, i
         if type(functionName) is str:
             functionName=functionName.encode('utf-8')
         if type(inputBuffer) is bytearray:
-            inputBufferV  = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
+            inputBufferV  = (ct.c_ubyte*len(inputBuffer)).from_buffer_copy(inputBuffer)
         if type(inputBuffer) is str:
             inputBuffer=inputBuffer.encode('utf-8')
             inputBufferV  = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
@@ -2204,20 +2301,19 @@ def simxCallScriptFunction(clientID, scriptDescription, options, functionName, i
 
     return ret, intDataOut, floatDataOut, stringDataOut, bufferOut
 
-def simxGetObjectVelocity(clientID, objectHandle, operationMode):
+def simxGetObjectVelocity(clientID, objectHandle, operationMode, out=None):
     '''
     Please have a look at the function description/documentation in the V-REP user manual
+    The result is written into out (6 elements: linear then angular) instead of new lists if given.
     '''
-    linearVel  = (ct.c_float*3)()
-    angularVel = (ct.c_float*3)()
-    ret = c_GetObjectVelocity(clientID, objectHandle, linearVel, angularVel, operationMode)
-    arr1 = []
-    for i in range(3):
-        arr1.append(linearVel[i])
-    arr2 = []
-    for i in range(3):
-        arr2.append(angularVel[i])
-    return ret, arr1, arr2 
+    linearVel  = _floatBuffer('linearVel', 3)
+    angularVel = _floatBuffer('angularVel', 3)
+    ret = _clearOnError(c_GetObjectVelocity(clientID, objectHandle, linearVel, angularVel, operationMode), linearVel, angularVel)
+    if out is not None:
+        out[0:3] = linearVel
+        out[3:6] = angularVel
+        return ret, out[0:3], out[3:6]
+    return ret, linearVel[:], angularVel[:]
 
 def simxPackInts(intList):
     '''
@@ -2268,3 +2364,33 @@ def simxUnpackFloats(floatsPackedInString):
     for i in range(int(len(floatsPackedInString)/4)):
         b.append(struct.unpack('<f',floatsPackedInString[4*i:4*(i+1)])[0])
     return b
+
+def simxPackIntsArray(intArray):
+    '''
+    Same as simxPackInts, but packs a sequence or numpy array in one operation
+    '''
+    return bytearray(np.asarray(intArray, dtype='<i4').tobytes())
+
+def simxUnpackIntsArray(intsPackedInString):
+    '''
+    Same as simxUnpackInts, but returns a numpy int32 array (a view on the input buffer)
+    '''
+    if isinstance(intsPackedInString, str):
+        intsPackedInString = intsPackedInString.encode('latin-1')
+    n = len(intsPackedInString)//4
+    return np.frombuffer(intsPackedInString, dtype='<i4', count=n)
+
+def simxPackFloatsArray(floatArray):
+    '''
+    Same as simxPackFloats, but packs a sequence or numpy array in one operation
+    '''
+    return bytearray(np.asarray(floatArray, dtype='<f4').tobytes())
+
+def simxUnpackFloatsArray(floatsPackedInString):
+    '''
+    Same as simxUnpackFloats, but returns a numpy float32 array (a view on the input buffer)
+    '''
+    if isinstance(floatsPackedInString, str):
+        floatsPackedInString = floatsPackedInString.encode('latin-1')
+    n = len(floatsPackedInString)//4
+    return np.frombuffer(floatsPackedInString, dtype='<f4', count=n)
@@ -0,0 +1,160 @@
+-- Server side helpers of vrep_env.
+--
+-- Copy this file into the 'lua' folder of V-REP and add the line
+--     require('vrep_env')
+-- at the top of the child script of any object in the scene.
+-- The VrepEnv methods using these helpers take the name of that object.
+
+-- State of objects for VrepEnv.capture_snapshot.
+-- inInts   : object handles
+-- outFloats: 9 values per object (x, y, z, alpha, beta, gamma, joint position,
+--            joint target position, joint target velocity), absolute; 0 for the
+--            joint values of other objects
+function vrep_env_capture(inInts,inFloats,inStrings,inBuffer)
+	local out={}
+	for i=1,#inInts,1 do
+		local h=inInts[i]
+		local p=simGetObjectPosition(h,-1)
+		local o=simGetObjectOrientation(h,-1)
+		local q,tp,tv=0,0,0
+		if simGetObjectType(h)==sim_object_joint_type and simGetJointType(h)~=sim_joint_spherical_subtype then
+			q=simGetJointPosition(h)
+			local r
+			r,tp=simGetJointTargetPosition(h)
+			tv=simGetJointTargetVelocity(h)
+		end
+		local s=(i-1)*9
+		out[s+1],out[s+2],out[s+3]=p[1],p[2],p[3]
+		out[s+4],out[s+5],out[s+6]=o[1],o[2],o[3]
+		out[s+7],out[s+8],out[s+9]=q,tp,tv
+	end
+	return {},out,{},''
+end
+
+-- Restores the state captured by VrepEnv.capture_snapshot without restarting the simulation.
+-- inInts  : object handles
+-- inFloats: 9 values per object, as returned by vrep_env_capture
+function vrep_env_restore(inInts,inFloats,inStrings,inBuffer)
+	-- Joints first, so that the absolute poses below are not moved afterwards
+	for i=1,#inInts,1 do
+		local h=inInts[i]
+		local s=(i-1)*9
+		if simGetObjectType(h)==sim_object_joint_type and simGetJointType(h)~=sim_joint_spherical_subtype then
+			simSetJointPosition(h,inFloats[s+7])
+			-- Otherwise the motors keep driving toward the targets of the last episode
+			simSetJointTargetPosition(h,inFloats[s+8])
+			simSetJointTargetVelocity(h,inFloats[s+9])
+		end
+	end
+	for i=1,#inInts,1 do
+		local h=inInts[i]
+		local s=(i-1)*9
+		simSetObjectPosition(h,-1,{inFloats[s+1],inFloats[s+2],inFloats[s+3]})
+		simSetObjectOrientation(h,-1,{inFloats[s+4],inFloats[s+5],inFloats[s+6]})
+		-- Drops the velocities accumulated by the physics engine
+		simResetDynamicObject(h)
+	end
+	return {},{},{},''
+end
+
+-- Server step (see VrepEnv.setup_server_step): the client sends the actions with
+-- vrep_env_step, without waiting for a reply; the step(s) run, then the sensing
+-- phase publishes the observation in a string signal that the client streams.
+-- Each step costs a single round trip, whatever the numbers of actuators and observed values.
+-- Add to the child script:
+--     if (sim_call_type==sim_childscriptcall_sensing) then vrep_env_sensing() end
+vrep_env_step_config=nil
+
+-- inInts: control (0 target velocity, 1 target position, 2 force), substeps,
+--         1 to return the observed values of every substep (0: of the last one),
+--         number of actuators, actuator handles,
+--         number of observed values, then (handle, simxGetObjectGroupData data type) for each
+function vrep_env_step_setup(inInts,inFloats,inStrings,inBuffer)
+	local c={control=inInts[1],substeps=inInts[2],every_substep=(inInts[3]~=0),
+		actuators={},observed={},remaining=0,step_id=0,data={}}
+	local i=5
+	for k=1,inInts[4],1 do
+		c.actuators[k]=inInts[i]
+		i=i+1
+	end
+	local n=inInts[i]
+	i=i+1
+	for k=1,n,1 do
+		c.observed[k]={inInts[i],inInts[i+1]}
+		i=i+2
+	end
+	vrep_env_step_config=c
+	return {},{},{},''
+end
+
+-- inInts  : step id, returned with the observation
+-- inBuffer: actions, packed floats
+function vrep_env_step(inInts,inFloats,inStrings,inBuffer)
+	local c=vrep_env_step_config
+	local actions=simUnpackFloats(inBuffer)
+	for k=1,#c.actuators,1 do
+		local h=c.actuators[k]
+		if c.control==0 then
+			simSetJointTargetVelocity(h,actions[k])
+		elseif c.control==1 then
+			simSetJointTargetPosition(h,actions[k])
+		else
+			simSetJointForce(h,actions[k])
+		end
+	end
+	c.step_id=inInts[1]
+	c.remaining=c.substeps
+	c.data={c.step_id,0}
+	-- Releases the waiting synchronous simulation, as simxSynchronousTrigger
+	simSetBoolParameter(sim_boolparam_waiting_for_trigger,false)
+	return {},{},{},''
+end
+
+local function vrep_env_append(data,values)
+	for k=1,#values,1 do
+		data[#data+1]=values[k]
+	end
+end
+
+-- Values of one observed (handle, data type), as simxGetObjectGroupData
+local function vrep_env_observe(data,h,t)
+	if t==3 then
+		vrep_env_append(data,simGetObjectPosition(h,-1))
+	elseif t==4 then
+		vrep_env_append(data,simGetObjectPosition(h,sim_handle_parent))
+	elseif t==5 then
+		vrep_env_append(data,simGetObjectOrientation(h,-1))
+	elseif t==6 then
+		vrep_env_append(data,simGetObjectOrientation(h,sim_handle_parent))
+	elseif t==9 then
+		vrep_env_append(data,simGetObjectPosition(h,-1))
+		vrep_env_append(data,simGetObjectOrientation(h,-1))
+	elseif t==15 then
+		data[#data+1]=simGetJointPosition(h)
+		data[#data+1]=simGetJointForce(h)
+	else
+		local linear,angular=simGetObjectVelocity(h)
+		if t==17 or t==19 then vrep_env_append(data,linear) end
+		if t==18 or t==19 then vrep_env_append(data,angular) end
+	end
+end
+
+function vrep_env_sensing()
+	local c=vrep_env_step_config
+	if not c or c.remaining==0 then
+		return
+	end
+	c.remaining=c.remaining-1
+	if c.every_substep or c.remaining==0 then
+		for k=1,#c.observed,1 do
+			vrep_env_observe(c.data,c.observed[k][1],c.observed[k][2])
+		end
+	end
+	if c.remaining>0 then
+		-- Next substep
+		simSetBoolParameter(sim_boolparam_waiting_for_trigger,false)
+		return
+	end
+	c.data[2]=simGetSimulationTime()
+	simSetStringSignal('vrep_env_observation',simPackFloats(c.data))
+end
@@ -1,14 +1,63 @@
 
 from vrep_env import vrep
+from vrep_env.profiling import RpcStats, PhaseTimer, TrafficStats
+from vrep_env.trace import TraceRecorder
 
+import os
 import gym
 import time
+import contextlib
+import concurrent.futures
 import numpy as np
 
+# Quantities available to VrepEnv.get_group_state
+#	name : (object type, simxGetObjectGroupData data type, floats per object)
+group_quantities = {
+	'position'         : (vrep.sim_appobj_object_type,  3, 3), # absolute x,y,z
+	'local_position'   : (vrep.sim_appobj_object_type,  4, 3), # relative to parent
+	'orientation'      : (vrep.sim_appobj_object_type,  5, 3), # absolute euler angles
+	'local_orientation': (vrep.sim_appobj_object_type,  6, 3), # relative to parent
+	'pose'             : (vrep.sim_appobj_object_type,  9, 6), # position + orientation
+	'lin_vel'          : (vrep.sim_appobj_object_type, 17, 3),
+	'ang_vel'          : (vrep.sim_appobj_object_type, 18, 3),
+	'velocity'         : (vrep.sim_appobj_object_type, 19, 6), # lin_vel + ang_vel
+	'joint_state'      : (vrep.sim_object_joint_type,  15, 2), # position, force/torque
+}
+
+# Object handles by name, per (server address, server port, scene id)
+handle_registry = {}
+
+# Camera rays of depth_to_pointcloud, by (height, width, fov)
+_ray_grids = {}
+
+def depth_to_pointcloud(depth, near, far, fov):
+	"""Projects a depth image from obj_get_depth_image into a (height*width, 3)
+	float32 point cloud in the sensor frame: x right, y up, z along the view.
+	near/far are the clipping planes and fov the perspective angle (radians),
+	which V-REP applies to the larger image dimension.
+	"""
+	height, width = depth.shape
+	key = (height, width, fov)
+	if key not in _ray_grids:
+		t = np.tan(fov/2.0)/max(height, width)
+		x = t*(2.0*np.arange(width ) + 1.0 - width )
+		y = t*(height - 2.0*np.arange(height) - 1.0)
+		rays = np.empty((height, width, 3), dtype='float32')
+		rays[:,:,0] = x[np.newaxis,:]
+		rays[:,:,1] = y[:,np.newaxis]
+		rays[:,:,2] = 1.0
+		_ray_grids[key] = rays.reshape(-1, 3)
+	# Depth values are normalized between the clipping planes
+	z = near + (far - near)*depth.reshape(-1, 1)
+	return (_ray_grids[key]*z).astype('float32', copy=False)
+
 class VrepEnv(gym.Env):
 	"""Superclass for V-REP environments.
 	"""
-	def __init__(self,server_addr,server_port,scene_path=None):
+	def __init__(self,server_addr,server_port,scene_path=None,trace=None):
+		"""trace: path of a trace file (or True for the default path, or a shared
+		trace.TraceRecorder) to trace from the connection on, see enable_trace.
+		"""
 		# Parameters
 		self.server_addr = server_addr
 		self.server_port = server_port
@@ -18,6 +67,79 @@ class VrepEnv(gym.Env):
 		#self.opM_get = vrep.simx_opmode_oneshot
 		self.opM_set = vrep.simx_opmode_oneshot
 		
+		# Remote API functions are looked up here (see enable_rpc_stats)
+		self.vrep = vrep
+		self.rpc_stats_enabled = False
+		
+		# Timeline of this env (see enable_trace)
+		self.trace = None
+		
+		# Network traffic counters (see enable_traffic_stats)
+		self.traffic = None
+		self.traffic_step_open = False
+		
+		# Step phase timings (see enable_phase_timer)
+		self.phase_timer = None
+		self.phase_info = False
+		
+		# Streaming getters (see set_streaming)
+		self.streaming = False
+		self.stream_wait_attempts = 8
+		# Set by restore_snapshot: streamed values predate the restore until the next step
+		self.stale_streams = False
+		# Pipelined stepping (see set_pipelined)
+		self.pipelined = False
+		# Age of the observations (see track_observation_age), simulation ms
+		self.age_tracking = False
+		self.strict_observations = False
+		self.strict_timeout = 1.0
+		self.sim_dt_ms = None
+		self.step_sim_time = None
+		self.observation_time = None
+		self.observation_age = None
+		self.subscriptions = {}
+		
+		# Nesting depth of batched_commands (a no-op unless batching)
+		self.batching = True
+		self.batch_depth = 0
+		
+		# Local view of handle_registry for the current scene
+		self.object_handles = None
+		self.handle_registry_key = None
+		
+		# Snapshot resets (see reset_simulation)
+		self.snapshot_script  = None # object whose child script requires vrep_env.lua
+		self.snapshot_handles = []
+		self.snapshot = None
+		
+		# Simulation steps per env step (step_simulation, server_step). Round trips
+		# only drop with server_step: step_simulation triggers each step
+		self.frame_skip = 1
+		# Optional callable returning the reward of a simulation step, summed over the
+		# steps of step_simulation in frame_reward; with streaming, each step is
+		# followed by a ping so that it reads the values of that step
+		self.substep_reward = None
+		self.frame_reward = 0.0
+		
+		# Compiled specs.ObservationSpec and specs.ActionSpec (see set_observation_spec, set_action_spec)
+		self.observation_plan = None
+		self.action_plan = None
+		
+		# Server step (see setup_server_step)
+		self.server_step_config = None
+		self.server_step_ready = False
+		self.server_step_id = 0
+		self.server_step_timeout = 10.0
+		self.server_step_time = None
+		self.substep_observations = None
+		
+		# Waiting for the server to stop (see stop_simulation)
+		self.stop_timeout = 30.0
+		self.stop_poll_delay = 0.001
+		self.stop_poll_max_delay = 0.1
+		self.last_stop_duration = None
+		self.executor = None
+		
 		# Status
 		self.cID = -1
 		self.connected = False
@@ -35,6 +157,14 @@ class VrepEnv(gym.Env):
 			'simx_return_local_error_flag',
 			'simx_return_initialize_error_flag']
 		
+		# Before connecting, so that the connection and the scene loading are traced
+		if isinstance(trace, TraceRecorder):
+			self.enable_trace(recorder=trace)
+		elif isinstance(trace, str):
+			self.enable_trace(trace)
+		elif trace:
+			self.enable_trace()
+		
 		self.connect(server_addr,server_port)
 		if not self.scene_loaded:
 			self.load_scene(scene_path)
@@ -51,13 +181,229 @@ class VrepEnv(gym.Env):
 		
 		return ret_tuple[1:] if istuple else None
 	
+	# Remote API getter wrapper
+	def RAPI_get(self, rapi_func, *args, **kwargs):
+		"""Calls a remote API getter as rapi_func(cID, *args, opmode, **kwargs).
+		In streaming mode the first call for a (function, *args) key subscribes
+		with simx_opmode_streaming; later calls only read the local buffer.
+		"""
+		if not self.streaming:
+			return self.RAPI_rc(rapi_func(self.cID, *args, self.opM_get, **kwargs))
+		if self.stale_streams:
+			return self.RAPI_rc(rapi_func(self.cID, *args, vrep.simx_opmode_blocking, **kwargs))
+		key = (rapi_func.__name__,) + args
+		if key not in self.subscriptions:
+			self.RAPI_rc(rapi_func(self.cID, *args, vrep.simx_opmode_streaming, **kwargs))
+			self.subscriptions[key] = (rapi_func, args)
+		ret_tuple = rapi_func(self.cID, *args, vrep.simx_opmode_buffer, **kwargs)
+		attempts = 0
+		while ret_tuple[0] == vrep.simx_return_novalue_flag and attempts < self.stream_wait_attempts:
+			# Nothing streamed yet: a ping is a full round trip, after which
+			# the first reply of the subscription is in the input buffer
+			self.vrep.simxGetPingTime(self.cID)
+			ret_tuple = rapi_func(self.cID, *args, vrep.simx_opmode_buffer, **kwargs)
+			attempts += 1
+		if self.age_tracking and ret_tuple[0] == vrep.simx_return_ok:
+			ret_tuple = self.check_observation_age(rapi_func, args, kwargs, ret_tuple)
+		# Never hand out the zeroed placeholder of a missing value
+		return self.RAPI_rc(ret_tuple, tolerance=vrep.simx_return_ok)
+	
+	def enable_rpc_stats(self, enabled=True):
+		"""Times every remote API call, see rpc_stats. Disabled, calls go straight
+		to the vrep module.
+		"""
+		self.rpc_stats_enabled = enabled
+		self._route_rpcs()
+	
+	def _route_rpcs(self):
+		if self.rpc_stats_enabled or self.trace is not None or self.traffic is not None:
+			if not isinstance(self.vrep, RpcStats):
+				self.vrep = RpcStats()
+			self.vrep.trace = self.trace
+			self.vrep.traffic = self.traffic
+		else:
+			self.vrep = vrep
+	
+	def rpc_stats(self, reset=False):
+		"""Count, total/mean/min/max duration (s) and return codes of the remote API
+		calls since the last reset, by function and operation mode.
+		"""
+		if not self.rpc_stats_enabled:
+			return {}
+		snapshot = self.vrep.snapshot()
+		if reset:
+			self.vrep.reset()
+		return snapshot
+	
+	def reset_rpc_stats(self):
+		if isinstance(self.vrep, RpcStats):
+			self.vrep.reset()
+	
+	def enable_phase_timer(self, enabled=True, window=1000, info=False):
+		"""Times the phases of step() marked by the subclass:
+			self.start_phases()
+			self._make_action(action);  self.end_phase('actuate')
+			self.step_simulation();     self.end_phase('trigger')
+			...
+			return observation, reward, done, self.end_step_phases(info)
+		over the last window steps (see phase_stats). If info, the durations of
+		each step (ns) are also returned in info['phase_ns'].
+		"""
+		self.phase_timer = PhaseTimer(window) if enabled else None
+		self.phase_info = info
+		if enabled:
+			self.phase_timer.trace = self.trace
+	
+	def start_phases(self):
+		if self.traffic is not None and not self.traffic_step_open:
+			# Traffic between steps (e.g. the observation of reset) is not part of a step
+			self.update_traffic()
+			self.traffic.discard_step()
+		if self.phase_timer is not None:
+			self.phase_timer.start()
+	
+	def end_phase(self, name):
+		if self.phase_timer is not None:
+			self.phase_timer.lap(name)
+	
+	def end_step_phases(self, info):
+		self.end_traffic_step()
+		if self.phase_timer is not None:
+			timings = self.phase_timer.end_step()
+			if self.phase_info:
+				info['phase_ns'] = timings
+		return info
+	
+	def phase_stats(self):
+		"""Percentiles and share of the step time of each phase, see PhaseTimer.summary.
+		"""
+		if self.phase_timer is None:
+			return {}
+		return self.phase_timer.summary()
+	
+	def enable_traffic_stats(self, enabled=True, ping_interval=100):
+		"""Counts the messages and (estimated) bytes sent and received per step
+		and per episode (reset_simulation), and samples the ping time every
+		ping_interval steps. See traffic_stats. A step lasts until end_step_phases,
+		or for envs not calling it until the next step_simulation (the commands sent
+		before it then count in the previous step).
+		"""
+		self.traffic = TrafficStats(ping_interval) if enabled else None
+		self._route_rpcs()
+	
+	def traffic_stats(self):
+		"""Counters of messages_out/in and bytes_out/in: total, per_step (mean),
+		last_step, episode (in progress), last_episode, and ping_ms samples.
+		"""
+		if self.traffic is None:
+			return {}
+		self.update_traffic()
+		return self.traffic.snapshot()
+	
+	def update_traffic(self):
+		# Local reads of the last message headers
+		_, out_message_id = vrep.simxGetOutMessageInfo(self.cID, vrep.simx_headeroffset_message_id)
+		_, in_message_id  = vrep.simxGetInMessageInfo(self.cID, vrep.simx_headeroffset_message_id)
+		self.traffic.update_messages(out_message_id, in_message_id)
+	
+	def enable_trace(self, path='vrep_env_{pid}_{port}.json', capacity=100000, recorder=None):
+		"""Records the remote API calls, step phases (enabling the phase timer),
+		resets and connections of this env on its own timeline track, as Chrome
+		trace events. The last capacity events are written to path ({pid} and
+		{port} are replaced) by flush_trace() and close(). Envs stepped by threads
+		can share a trace.TraceRecorder passed as recorder.
+		"""
+		if recorder is None:
+			recorder = TraceRecorder(path.format(pid=os.getpid(), port=self.server_port), capacity)
+		self.trace = recorder.track('{}:{}'.format(self.server_addr, self.server_port))
+		if self.phase_timer is None:
+			self.enable_phase_timer()
+		self.phase_timer.trace = self.trace
+		self._route_rpcs()
+	
+	def flush_trace(self):
+		if self.trace is not None:
+			self.trace.recorder.flush()
+	
+	def trace_span(self, name, args=None):
+		"""Context recording an env event on the trace, if enabled.
+		"""
+		if self.trace is None:
+			return contextlib.nullcontext()
+		return self.trace.span(name, 'env', args)
+	
+	def set_streaming(self, enabled):
+		"""Switches getters between blocking calls and streamed buffer reads.
+		"""
+		if self.streaming and not enabled:
+			self.discontinue_streams()
+		self.streaming = enabled
+	
+	def set_pipelined(self, enabled=True):
+		"""Pipelined stepping: streamed getters, the setters of a step sent as one
+		message, and a ping after the trigger (step_simulation). The trigger is
+		acknowledged before the step runs; the ping comes back after it, together
+		with the streamed values of the step, which getters then read locally.
+		A step costs two round trips whatever the number of getters.
+		"""
+		self.pipelined = enabled
+		self.set_streaming(enabled)
+		if enabled:
+			self.batching = True
+	
+	def track_observation_age(self, enabled=True, strict=False, timeout=1.0):
+		"""Tracks the simulation time of the streamed values read by the getters
+		(simxGetLastCmdTime) against the time reached by the last step_simulation.
+		observation_age is then how far (simulation ms) the oldest value read since
+		the step lags behind, 0 if all are fresh. With strict, getters wait for the
+		value of the step, one ping (round trip) at a time for at most timeout
+		seconds, unless the server reports a stopped or paused simulation.
+		"""
+		self.age_tracking = enabled
+		self.strict_observations = strict
+		self.strict_timeout = timeout
+		self.observation_time = None
+		self.observation_age = None
+	
+	def check_observation_age(self, rapi_func, args, kwargs, ret_tuple):
+		data_time = self.vrep.simxGetLastCmdTime(self.cID)
+		if self.step_sim_time is None:
+			return ret_tuple
+		if self.strict_observations and data_time < self.step_sim_time:
+			t_start = time.time()
+			while data_time < self.step_sim_time:
+				_, server_state = self.vrep.simxGetInMessageInfo(self.cID, vrep.simx_headeroffset_server_state)
+				if not server_state & 1 or server_state & 2:
+					# Stopped or paused: no newer value is coming
+					break
+				if time.time() - t_start > self.strict_timeout:
+					raise RuntimeError('No value of '+rapi_func.__name__+' at simulation time '
+						+str(self.step_sim_time)+' ms within '+str(self.strict_timeout)+' s.')
+				# A ping waits for one round trip, after which the values streamed
+				# meanwhile are in the input buffer
+				self.vrep.simxGetPingTime(self.cID)
+				ret_tuple = rapi_func(self.cID, *args, vrep.simx_opmode_buffer, **kwargs)
+				data_time = self.vrep.simxGetLastCmdTime(self.cID)
+		if self.observation_time is None or data_time < self.observation_time:
+			self.observation_time = data_time
+		self.observation_age = max(0, self.step_sim_time - self.observation_time)
+		return ret_tuple
+	
+	def discontinue_streams(self):
+		"""Ends all streaming subscriptions on the server.
+		"""
+		for rapi_func, args in self.subscriptions.values():
+			rapi_func(self.cID, *args, vrep.simx_opmode_discontinue)
+		self.subscriptions = {}
+	
 	def connect(self, server_addr, server_port):
 		if self.connected:
 			raise RuntimeError('Client is already connected.')
 		attempts = 0
 		max_attempts = 64
+		t_start = time.perf_counter_ns()
 		while True:
-			self.cID = vrep.simxStart(
+			self.cID = self.vrep.simxStart(
 				connectionAddress              = server_addr,
 				connectionPort                 = server_port,
 				waitUntilConnected             = True,
@@ -70,9 +416,14 @@ class VrepEnv(gym.Env):
 				break
 			elif attempts < max_attempts:
 				print('Unable to connect to V-REP at ',server_addr,':',server_port,'. Retrying...')
+				if self.trace is not None:
+					self.trace.instant('connect_retry', 'env', {'attempt': attempts})
 				time.sleep(4)
 			else:
 				raise RuntimeError('Unable to connect to V-REP.')
+		if self.trace is not None:
+			self.trace.complete('connect', 'env', t_start, time.perf_counter_ns() - t_start,
+				{'attempts': attempts})
 		
 		# Setting up debug signal
 		self.set_integer_signal('sig_debug',1337)
@@ -98,20 +449,27 @@ class VrepEnv(gym.Env):
 		if not self.connected:
 			raise RuntimeError('Client is not even connected.')
 		# Clearing debug signal
-		vrep.simxClearIntegerSignal(self.cID,'sig_debug', vrep.simx_opmode_blocking)
-		vrep.simxFinish(self.cID)
+		self.vrep.simxClearIntegerSignal(self.cID,'sig_debug', vrep.simx_opmode_blocking)
+		self.vrep.simxFinish(self.cID)
 		self.connected = False
 	
 	def load_scene(self, scene_path):
 		if self.scene_loaded:
 			raise RuntimeError('Scene is already loaded.')
-		self.RAPI_rc(vrep.simxLoadScene(self.cID,scene_path,0, vrep.simx_opmode_blocking))
+		self.forget_object_handles()
+		self.snapshot = None
+		with self.trace_span('load_scene', {'scene_path': scene_path}):
+			self.RAPI_rc(self.vrep.simxLoadScene(self.cID,scene_path,0, vrep.simx_opmode_blocking))
 		self.scene_loaded = True
 	
 	def close_scene(self):
 		if not self.scene_loaded:
 			raise RuntimeError('Scene is not loaded.')
-		self.RAPI_rc(vrep.simxCloseScene(self.cID, vrep.simx_opmode_blocking))
+		# Subscribed handles do not outlive the scene
+		self.discontinue_streams()
+		self.forget_object_handles()
+		self.snapshot = None
+		self.RAPI_rc(self.vrep.simxCloseScene(self.cID, vrep.simx_opmode_blocking))
 		self.scene_loaded = False
 	
 	def start_simulation(self):
@@ -124,8 +482,11 @@ class VrepEnv(gym.Env):
 		# Optionally override delta time
 		#self.set_float_parameter(vrep.sim_floatparam_simulation_time_step, 25)
 		
-		self.RAPI_rc(vrep.simxSynchronous(self.cID,True))
-		self.RAPI_rc(vrep.simxStartSimulation(self.cID, vrep.simx_opmode_blocking))
+		self.RAPI_rc(self.vrep.simxSynchronous(self.cID,True))
+		self.RAPI_rc(self.vrep.simxStartSimulation(self.cID, vrep.simx_opmode_blocking))
+		self.server_step_ready = False
+		self.sim_dt_ms = None
+		self.step_sim_time = None
 		
 		# Enable Threaded Rendering for faster simulation
 		if not self.is_headless:
@@ -133,50 +494,252 @@ class VrepEnv(gym.Env):
 		
 		self.sim_running = True
 	
-	def stop_simulation(self):
+	def stop_simulation(self, timeout=None):
+		"""Stops the simulation and waits until the server reports it stopped,
+		polling with exponential backoff for at most timeout (stop_timeout) seconds.
+		Returns how long it took, also kept in last_stop_duration.
+		"""
 		if not self.sim_running:
 			raise RuntimeError('Simulation is not running.')
+		timeout = self.stop_timeout if timeout is None else timeout
+		t_start = time.time()
 		
-		self.RAPI_rc(vrep.simxStopSimulation(self.cID, vrep.simx_opmode_blocking))
+		self.RAPI_rc(self.vrep.simxStopSimulation(self.cID, vrep.simx_opmode_blocking))
 		
 		# Checking if the server really stopped
-		try:
-			while True:
-				self.RAPI_rc(vrep.simxGetIntegerSignal(self.cID,'sig_debug',vrep.simx_opmode_blocking))
-				e = vrep.simxGetInMessageInfo(self.cID,vrep.simx_headeroffset_server_state)
-				still_running = e[1] & 1
-				if not still_running:
-					break
-		except: pass
+		# (a ping is a round trip, refreshing the server state of the last reply)
+		delay = self.stop_poll_delay
+		while True:
+			self.RAPI_rc(self.vrep.simxGetPingTime(self.cID))
+			_, server_state = self.vrep.simxGetInMessageInfo(self.cID,vrep.simx_headeroffset_server_state)
+			still_running = server_state & 1
+			if not still_running:
+				break
+			if time.time() - t_start > timeout:
+				raise RuntimeError('Simulation did not stop within '+str(timeout)+' s.')
+			time.sleep(delay)
+			delay = min(2*delay, self.stop_poll_max_delay)
 		self.sim_running = False
+		self.last_stop_duration = time.time() - t_start
+		return self.last_stop_duration
+	
+	def stop_simulation_async(self, timeout=None):
+		"""Runs stop_simulation in a background thread and returns a
+		concurrent.futures.Future of its duration, so that several envs can stop
+		at once. Do not use this env before the future is done.
+		"""
+		if self.executor is None:
+			self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		return self.executor.submit(self.stop_simulation, timeout)
 	
 	def step_simulation(self):
-		self.RAPI_rc(vrep.simxSynchronousTrigger(self.cID))
+		"""Advances frame_skip simulation steps, one trigger (round trip) each: the
+		trigger is a blocking call that cannot be batched, so frame_skip saves no
+		round trips here. server_step (see setup_server_step) runs them all in one.
+		"""
+		self.end_traffic_step()
+		self.frame_reward = 0.0
+		self.stale_streams = False
+		for i in range(self.frame_skip):
+			self.RAPI_rc(self.vrep.simxSynchronousTrigger(self.cID))
+			if self.age_tracking:
+				self.end_age_step()
+			if (self.substep_reward is not None and self.streaming) or \
+					(self.pipelined and i == self.frame_skip - 1):
+				# Barrier: the trigger is acknowledged before the step runs, the
+				# streamed values of the step are in once the ping is back
+				self.RAPI_rc(self.vrep.simxGetPingTime(self.cID))
+			if self.substep_reward is not None:
+				self.frame_reward += self.substep_reward()
+		self.traffic_step_open = self.traffic is not None
+	
+	def end_age_step(self):
+		# The trigger is processed at the time the step starts
+		trigger_time = self.vrep.simxGetLastCmdTime(self.cID)
+		if self.sim_dt_ms is None:
+			self.sim_dt_ms = int(round(1000*self.get_float_parameter(vrep.sim_floatparam_simulation_time_step)))
+		self.step_sim_time = trigger_time + self.sim_dt_ms
+		self.observation_time = None
+		self.observation_age = 0
+	
+	def end_traffic_step(self):
+		"""Closes the traffic counters of the step in progress, if any.
+		"""
+		if self.traffic is None or not self.traffic_step_open:
+			return
+		self.traffic_step_open = False
+		if self.traffic.ping_due():
+			# Counted in the step that samples it
+			_, ping_time = self.vrep.simxGetPingTime(self.cID)
+			self.traffic.pings.append(ping_time)
+		self.update_traffic()
+		self.traffic.end_step()
+	
+	def setup_server_step(self, script, actuators, observed, control='velocity', substeps=None,
+			every_substep=False):
+		"""Configures server_step. script is the object whose child script requires
+		vrep_env.lua and calls vrep_env_sensing() in its sensing phase; actuators
+		are joint handles driven as in set_joint_targets(control); observed lists
+		the (handle, quantity) pairs returned, quantities as in group_quantities.
+		substeps defaults to frame_skip. With every_substep, the observed values of
+		all substeps are returned, in substep_observations (e.g. for per-substep rewards).
+		"""
+		if substeps is None:
+			substeps = self.frame_skip
+		controls = {'velocity': 0, 'position': 1, 'force': 2}
+		ints = [controls[control], substeps, int(every_substep), len(actuators)] + list(actuators)
+		ints += [len(observed)]
+		for handle, quantity in observed:
+			ints += [handle, group_quantities[quantity][1]]
+		self.server_step_config = (script, ints, control, substeps if every_substep else 1)
+		self.server_step_ready = False
+	
+	def server_step(self, actions, out=None):
+		"""Sends the actions and runs substeps simulation steps with a single round
+		trip: the actions go with a call to vrep_env_step that is not waited for,
+		and the observed values come back in a streamed signal once the steps are done
+		(each ping waiting for them adds a round trip).
+		Returns them as a float32 array (into out if given); their simulation time
+		is kept in server_step_time.
+		"""
+		script, ints, control, observations = self.server_step_config
+		self.end_traffic_step()
+		# The signal read below is always that of this step
+		self.stale_streams = False
+		if not self.server_step_ready:
+			# Child scripts start over with each simulation
+			self.call_childscript_function(script, 'vrep_env_step_setup', (ints, [], [], bytearray()))
+			self.server_step_ready = True
+		key = ('simxGetStringSignal', 'vrep_env_observation')
+		if key not in self.subscriptions:
+			self.RAPI_rc(self.vrep.simxGetStringSignal(self.cID, 'vrep_env_observation',
+				vrep.simx_opmode_streaming), tolerance=vrep.simx_return_novalue_flag)
+			self.subscriptions[key] = (self.vrep.simxGetStringSignal, ('vrep_env_observation',))
+		actions = np.asarray(actions, dtype='float32')
+		if control == 'position':
+			actions = -np.deg2rad(actions)
+		# Exact as float32
+		self.server_step_id = self.server_step_id % 1000000 + 1
+		self.RAPI_rc(self.vrep.simxCallScriptFunction(self.cID,
+			script, vrep.sim_scripttype_childscript, 'vrep_env_step',
+			[self.server_step_id], [], [], vrep.simxPackFloatsArray(actions),
+			vrep.simx_opmode_oneshot))
+		# Local reads until the observation of this step arrives
+		t_start = time.time()
+		while True:
+			ret, packed = self.vrep.simxGetStringSignal(self.cID, 'vrep_env_observation',
+				vrep.simx_opmode_buffer)
+			if ret == vrep.simx_return_ok:
+				data = np.frombuffer(packed, dtype='<f4')
+				if int(data[0]) == self.server_step_id:
+					break
+			if time.time() - t_start > self.server_step_timeout:
+				raise RuntimeError('No observation from vrep_env_step within '+str(self.server_step_timeout)+' s.')
+			# Not there yet: a ping waits for one round trip, after which the
+			# replies streamed meanwhile are in the input buffer
+			self.RAPI_rc(self.vrep.simxGetPingTime(self.cID))
+		self.server_step_time = float(data[1])
+		self.substep_observations = data[2:].reshape(observations, -1)
+		if out is None:
+			out = np.empty(self.substep_observations.shape[1], dtype='float32')
+		out[:] = self.substep_observations[-1]
+		self.traffic_step_open = self.traffic is not None
+		return out
+	
+	def reset_simulation(self, full_restart=False):
+		"""Brings the scene back to its initial state.
+		If snapshot_script and snapshot_handles are set, the state captured after
+		the first start is restored with one call while the simulation keeps
+		running. Otherwise (or if full_restart) the simulation is stopped and started.
+		"""
+		if self.traffic is not None:
+			self.end_traffic_step()
+			self.update_traffic()
+			self.traffic.end_episode()
+		with self.trace_span('reset_simulation', {'full_restart': full_restart}):
+			if self.sim_running and self.snapshot is not None and not full_restart:
+				self.restore_snapshot()
+			else:
+				if self.sim_running:
+					self.stop_simulation()
+				self.start_simulation()
+				if self.snapshot is None and self.snapshot_script is not None and self.snapshot_handles:
+					self.capture_snapshot()
+		if self.traffic is not None:
+			# The reset counts in the episode, not in its first step
+			self.update_traffic()
+			self.traffic.discard_step()
+	
+	def capture_snapshot(self):
+		"""Records the absolute poses of snapshot_handles, and the positions and
+		target positions and velocities of the joints among them (vrep_env_capture).
+		"""
+		handles = list(self.snapshot_handles)
+		_, state, _, _ = self.call_childscript_function(self.snapshot_script, 'vrep_env_capture',
+			(handles, [], [], bytearray()))
+		self.snapshot = (handles, list(state))
+	
+	def restore_snapshot(self):
+		handles, state = self.snapshot
+		self.call_childscript_function(self.snapshot_script, 'vrep_env_restore',
+			(handles, state, [], bytearray()))
+		# Nothing is streamed until the next step: getters read with blocking calls meanwhile
+		self.stale_streams = True
 	
 	# Below are all wrapped methods unrelated to connection/scene
 	
 	# misc methods
 	
 	def add_statusbar_message(self, message):
-		self.RAPI_rc(vrep.simxAddStatusbarMessage(self.cID, message, vrep.simx_opmode_blocking))
+		self.RAPI_rc(self.vrep.simxAddStatusbarMessage(self.cID, message, vrep.simx_opmode_blocking))
 	
 	# object methods
 	
 	def get_object_handle(self, name):
-		handle, = self.RAPI_rc(vrep.simxGetObjectHandle(self.cID, name, vrep.simx_opmode_blocking))
+		if self.object_handles is None:
+			self.load_object_handles()
+		handle = self.object_handles.get(name)
+		if handle is None:
+			# Not in the registry (e.g. created after it was loaded)
+			handle, = self.RAPI_rc(self.vrep.simxGetObjectHandle(self.cID, name, vrep.simx_opmode_blocking))
+			self.object_handles[name] = handle
 		return handle
+	def get_object_handles(self, names):
+		return [self.get_object_handle(name) for name in names]
+	
+	def load_object_handles(self):
+		"""Resolves the names of all scene objects with a single call, unless they
+		are already in handle_registry for this server and scene.
+		"""
+		# Scene id of the last reply received from the server
+		_, scene_id = self.vrep.simxGetInMessageInfo(self.cID, vrep.simx_headeroffset_scene_id)
+		key = (self.server_addr, self.server_port, scene_id)
+		if key not in handle_registry:
+			handles, _, _, names = self.RAPI_rc(self.vrep.simxGetObjectGroupData(self.cID,
+				vrep.sim_appobj_object_type, 0, vrep.simx_opmode_blocking))
+			_, scene_id = self.vrep.simxGetInMessageInfo(self.cID, vrep.simx_headeroffset_scene_id)
+			key = (self.server_addr, self.server_port, scene_id)
+			handle_registry[key] = dict(zip(names, handles))
+		self.handle_registry_key = key
+		self.object_handles = handle_registry[key]
+	
+	def forget_object_handles(self):
+		handle_registry.pop(self.handle_registry_key, None)
+		self.handle_registry_key = None
+		self.object_handles = None
 	
 	# "getters"
 	
-	def obj_get_position(self, handle, relative_to=None):
-		position, = self.RAPI_rc(vrep.simxGetObjectPosition( self.cID,handle,
-			-1 if relative_to is None else relative_to,
-			self.opM_get))
+	# getters taking an out argument write into it (e.g. a slice of a
+	# preallocated observation array) instead of returning new lists
+	
+	def obj_get_position(self, handle, relative_to=None, out=None):
+		position, = self.RAPI_get(self.vrep.simxGetObjectPosition, handle,
+			-1 if relative_to is None else relative_to, out=out)
 		return position
-	def obj_get_orientation(self, handle, relative_to=None):
-		eulerAngles, = self.RAPI_rc(vrep.simxGetObjectOrientation( self.cID,handle,
-			-1 if relative_to is None else relative_to,
-			self.opM_get))
+	def obj_get_orientation(self, handle, relative_to=None, out=None):
+		eulerAngles, = self.RAPI_get(self.vrep.simxGetObjectOrientation, handle,
+			-1 if relative_to is None else relative_to, out=out)
 		return eulerAngles
 	def obj_get_orientation_continuous(self, handle, relative_to=None):
 		ea = self.obj_get_orientation(handle,relative_to)
@@ -186,79 +749,162 @@ class VrepEnv(gym.Env):
 			np.sin(ea[2]),np.cos(ea[2])]
 	
 	# (linearVel, angularVel)
-	def obj_get_velocity(self, handle):
-		return self.RAPI_rc(vrep.simxGetObjectVelocity( self.cID,handle,
-			self.opM_get))
+	def obj_get_velocity(self, handle, out=None):
+		return self.RAPI_get(self.vrep.simxGetObjectVelocity, handle, out=out)
 	def obj_get_joint_angle(self, handle):
-		angle, = self.RAPI_rc(vrep.simxGetJointPosition( self.cID,handle,
-				self.opM_get))
+		angle, = self.RAPI_get(self.vrep.simxGetJointPosition, handle)
 		#return -np.rad2deg(angle[0])
 		return angle
 	def obj_get_joint_angle_continuous(self, handle):
 		rad = self.obj_get_joint_angle(handle)
 		return [np.sin(rad),np.cos(rad)]
 	def obj_get_joint_force(self, handle):
-		force = self.RAPI_rc(vrep.simxGetJointForce( self.cID,handle,
-				self.opM_get))
+		force = self.RAPI_get(self.vrep.simxGetJointForce, handle)
 		return force
 	def obj_read_force_sensor(self, handle):
-		state, forceVector, torqueVector = self.RAPI_rc(vrep.simxReadForceSensor( self.cID,handle,
-			self.opM_get))
+		state, forceVector, torqueVector = self.RAPI_get(self.vrep.simxReadForceSensor, handle)
 		if   state & 1 != 1: # bit 0 not set
 			return None # sensor data not (yet) available
 		elif state & 2 == 1: # bit 1 set
 			return 0 # force sensor is broken
 		else:
 			return forceVector, torqueVector
-	def obj_get_vision_image(self, handle):
-		resolution, image = self.RAPI_rc(vrep.simxGetVisionSensorImage( self.cID,handle,
-			0, # assume RGB
-			self.opM_get,))
-		dim, im = resolution, image
-		nim = np.array(im, dtype='uint8')
-		nim = np.reshape(nim, (dim[1], dim[0], 3))
-		nim = np.flip(nim, 0)  # horizontal flip
-		#nim = np.flip(nim, 2)  # RGB -> BGR
-		return nim
+	
+	def get_group_state(self, handles, quantities, out=None):
+		"""Gets the given quantities of many objects with one call per quantity.
+		Returns a float32 array laid out object by object, each object holding
+		its quantities in the given order (see group_quantities for widths).
+		"""
+		widths = [group_quantities[q][2] for q in quantities]
+		if out is None:
+			out = np.empty(len(handles)*sum(widths), dtype='float32')
+		state = out.reshape(len(handles), sum(widths))
+		col = 0
+		for q, width in zip(quantities, widths):
+			object_type, data_type, _ = group_quantities[q]
+			all_handles, _, float_data, _ = self.RAPI_get(self.vrep.simxGetObjectGroupData,
+				object_type, data_type)
+			index = {h:i for i, h in enumerate(all_handles)}
+			try:
+				rows = [index[h] for h in handles]
+			except KeyError as e:
+				raise RuntimeError('Object '+str(e)+' has no '+q+' data.')
+			data = np.asarray(float_data, dtype='float32').reshape(-1, width)
+			state[:, col:col+width] = data[rows]
+			col += width
+		return out
+	
+	def set_observation_spec(self, spec):
+		"""Compiles spec (a specs.ObservationSpec) for make_observation, preallocates
+		observation and derives observation_space (unbounded) from it.
+		"""
+		self.observation_plan = spec.compile(self)
+		self.observation = np.zeros(spec.size, dtype='float32')
+		self.observation_space = spec.space()
+	
+	def make_observation(self):
+		"""Fetches the observation of the spec into observation and returns it
+		(the same array every time: copy it to keep it).
+		"""
+		return self.observation_plan.fetch(self.observation)
+	
+	def obj_get_vision_image(self, handle, grayscale=False, out=None):
+		"""Returns the image as a (height, width, 3) uint8 array, or (height, width)
+		if grayscale. The image is copied once, into out if given.
+		"""
+		resolution, image = self.RAPI_get(self.vrep.simxGetVisionSensorImageArray, handle,
+			1 if grayscale else 0, out=out)
+		#image = np.flip(image, 2)  # RGB -> BGR
+		return image
+	
+	def obj_get_depth_image(self, handle, out=None):
+		"""Returns the depth buffer as a (height, width) float32 array, normalized
+		between the near and far clipping planes. It is copied once, into out if given.
+		"""
+		resolution, depth = self.RAPI_get(self.vrep.simxGetVisionSensorDepthBufferArray, handle,
+			out=out)
+		return depth
 	
 	# "setters"
 	
+	@contextlib.contextmanager
+	def batched_commands(self):
+		"""Holds back outgoing commands so that all of them are sent in a single
+		message, which the server applies within the same simulation step.
+		"""
+		if not self.batching:
+			yield
+			return
+		if self.batch_depth == 0:
+			self.RAPI_rc(self.vrep.simxPauseCommunication(self.cID, True))
+		self.batch_depth += 1
+		try:
+			yield
+		finally:
+			self.batch_depth -= 1
+			if self.batch_depth == 0:
+				self.RAPI_rc(self.vrep.simxPauseCommunication(self.cID, False))
+	
+	def set_joint_targets(self, handles, values, control='velocity'):
+		"""Sets one target per joint in a single message.
+		control is 'velocity', 'position' (degrees, as obj_set_position_target) or 'force'.
+		"""
+		setter = {
+			'velocity': self.obj_set_velocity,
+			'position': self.obj_set_position_target,
+			'force'   : self.obj_set_force,
+		}[control]
+		with self.batched_commands():
+			for handle, value in zip(handles, values):
+				setter(handle, float(value))
+	
+	def set_action_spec(self, spec):
+		"""Compiles spec (a specs.ActionSpec) for make_action and derives
+		action_space from it.
+		"""
+		self.action_plan = spec.compile(self)
+		self.action_space = spec.space()
+	
+	def make_action(self, action):
+		"""Sends the targets of the action of the spec, in a single message.
+		"""
+		self.action_plan.send(action)
+	
 	def obj_set_position_target(self, handle, angle):
-		return self.RAPI_rc(vrep.simxSetJointTargetPosition( self.cID,handle,
+		return self.RAPI_rc(self.vrep.simxSetJointTargetPosition( self.cID,handle,
 			-np.deg2rad(angle),
 			self.opM_set))
 	def obj_set_velocity(self, handle, v):
-		return self.RAPI_rc(vrep.simxSetJointTargetVelocity( self.cID,handle,
+		return self.RAPI_rc(self.vrep.simxSetJointTargetVelocity( self.cID,handle,
 			v,
 			self.opM_set))
 	def obj_set_force(self, handle, f):
-		return self.RAPI_rc(vrep.simxSetJointForce( self.cID,handle,
+		return self.RAPI_rc(self.vrep.simxSetJointForce( self.cID,handle,
 			f,
 			self.opM_set))
 	def obj_set_position(self, handle, pos, relative_to=None):
-		return self.RAPI_rc(vrep.simxSetObjectPosition( self.cID,handle,
+		return self.RAPI_rc(self.vrep.simxSetObjectPosition( self.cID,handle,
 			-1 if relative_to is None else relative_to,
 			pos,
 			self.opM_set))
 	def obj_set_orientation(self, handle, eulerAngles, relative_to=None):
-		return self.RAPI_rc(vrep.simxSetObjectOrientation( self.cID,handle,
+		return self.RAPI_rc(self.vrep.simxSetObjectOrientation( self.cID,handle,
 			-1 if relative_to is None else relative_to,
 			eulerAngles,
 			self.opM_set))
 	# collisions
 	
 	def get_collision_handle(self, name):
-		handle, = self.RAPI_rc(vrep.simxGetCollisionHandle(self.cID, name, vrep.simx_opmode_blocking))
+		handle, = self.RAPI_rc(self.vrep.simxGetCollisionHandle(self.cID, name, vrep.simx_opmode_blocking))
 		return handle
 	def read_collision(self, handle):
-		collisionState, = self.RAPI_rc(vrep.simxReadCollision( self.cID,handle,
-				self.opM_get))
+		collisionState, = self.RAPI_get(self.vrep.simxReadCollision, handle)
 		return collisionState
 	
 	# signals
 	
 	def set_integer_signal(self, sig_name, sig_val):
-		return self.RAPI_rc(vrep.simxSetIntegerSignal( self.cID,
+		return self.RAPI_rc(self.vrep.simxSetIntegerSignal( self.cID,
 			sig_name, sig_val,
 			self.opM_set))
 	def set_float_signal(self, sig_name, sig_val):
@@ -271,58 +917,52 @@ class VrepEnv(gym.Env):
 			self.opM_set))
 	
 	def get_integer_signal(self, sig_name):
-		return self.RAPI_rc(vrep.simxGetIntegerSignal( self.cID,
-			sig_name,
-			self.opM_get))
+		return self.RAPI_get(self.vrep.simxGetIntegerSignal, sig_name)
 	def get_float_signal(self, sig_name):
-		return self.RAPI_rc(vrep.simxGetFloatSignal( self.cID,
-			sig_name,
-			self.opM_get))
+		return self.RAPI_get(self.vrep.simxGetFloatSignal, sig_name)
 	def get_string_signal(self, sig_name):
-		return self.RAPI_rc(vrep.simxGetStringSignal( self.cID,
-			sig_name,
-			self.opM_get))
+		return self.RAPI_get(self.vrep.simxGetStringSignal, sig_name)
 	
 	# parameters
 	
 	def set_boolean_parameter(self, param_id, param_val):
-		return self.RAPI_rc(vrep.simxSetBooleanParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxSetBooleanParameter( self.cID,
 			param_id, param_val,
 			vrep.simx_opmode_blocking))
 	def set_integer_parameter(self, param_id, param_val):
-		return self.RAPI_rc(vrep.simxSetIntegerParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxSetIntegerParameter( self.cID,
 			param_id, param_val,
 			vrep.simx_opmode_blocking))
 	def set_float_parameter(self, param_id, param_val):
-		return self.RAPI_rc(vrep.simxSetFloatingParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxSetFloatingParameter( self.cID,
 			param_id, param_val,
 			vrep.simx_opmode_blocking))
 	def set_array_parameter(self, param_id, param_val):
-		return self.RAPI_rc(vrep.simxSetArrayParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxSetArrayParameter( self.cID,
 			param_id, param_val,
 			vrep.simx_opmode_blocking))
 	
 	def get_boolean_parameter(self, param_id):
-		return self.RAPI_rc(vrep.simxGetBooleanParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxGetBooleanParameter( self.cID,
 			param_id,
 			vrep.simx_opmode_blocking))[0]
 	def get_integer_parameter(self, param_id):
-		return self.RAPI_rc(vrep.simxGetIntegerParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxGetIntegerParameter( self.cID,
 			param_id,
 			vrep.simx_opmode_blocking))[0]
 	def get_float_parameter(self, param_id):
-		return self.RAPI_rc(vrep.simxGetFloatingParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxGetFloatingParameter( self.cID,
 			param_id,
 			vrep.simx_opmode_blocking))[0]
 	def get_array_parameter(self, param_id):
-		return self.RAPI_rc(vrep.simxGetArrayParameter( self.cID,
+		return self.RAPI_rc(self.vrep.simxGetArrayParameter( self.cID,
 			param_id,
 			vrep.simx_opmode_blocking))[0]
 	
 	# scripts
 	# child scripts
 	def call_childscript_function(self,obj_name,func_name,in_tuple):
-		return self.RAPI_rc(vrep.simxCallScriptFunction(self.cID,
+		return self.RAPI_rc(self.vrep.simxCallScriptFunction(self.cID,
 			obj_name,vrep.sim_scripttype_childscript,func_name,
 			in_tuple[0],in_tuple[1],in_tuple[2],in_tuple[3],
 			vrep.simx_opmode_blocking))
@@ -348,11 +988,18 @@ class VrepEnv(gym.Env):
 	
 	#def _close(self):
 	def close(self):
+		# Waits for a pending stop_simulation_async
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
 		if self.sim_running:
 			self.stop_simulation()
+		if self.connected:
+			self.discontinue_streams()
 		# Closing the scene is unnecessary
 		#if self.scene_loaded:
 		#	self.close_scene()
 		if self.connected:
 			self.disconnect()
+		self.flush_trace()
 	